@@ -1,275 +1,799 @@
+import argparse
+import asyncio
+import glob
+import os
 import requests
+import httpx
 from bs4 import BeautifulSoup
-import pandas as pd
 import time
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from concurrent.futures import ProcessPoolExecutor
 from urllib.parse import urljoin
 import logging
+import multiprocessing
+import socket
+
+import extraction
+import metrics
+from crawl_state import CrawlState
+from http_cache import ResponseCache
+from fake_sheets import FakeSheetsClient
+from logging_setup import setup_logging
+from pipeline import Stage, run_pipeline
+from sinks import GoogleSheetSink, open_sink
+from throttle import AdaptiveThrottle
+from work_queue import WorkQueue
+
+# Hot-path metrics, looked up once
+FETCH_SECONDS = metrics.histogram('fetch_seconds', site='businesslist')
+FETCH_BYTES = metrics.counter('fetch_bytes_total', site='businesslist')
+FETCH_RETRIES = metrics.counter('fetch_retries_total', site='businesslist')
+FETCH_ERRORS = metrics.counter('fetch_errors_total', site='businesslist')
+CACHE_HITS = metrics.counter('cache_hits_total', site='businesslist')
+CACHE_REVALIDATED = metrics.counter('cache_revalidated_total', site='businesslist')
+PARSE_LINKS_SECONDS = metrics.histogram('parse_seconds', parser='extract_business_links')
+PARSE_DETAILS_SECONDS = metrics.histogram('parse_seconds', parser='extract_business_details')
+metrics.describe('fetch_seconds', "Time from sending a request to having its response")
+metrics.describe('parse_seconds', "Time spent extracting data from one page")
+metrics.describe('parse_roundtrip_seconds',
+                 "Time to parse one page in the process pool, including queueing and pickling")
+# Histograms for _run_parser, by (parser, pooled), so each is looked up from the registry once
+_PARSE_HISTOGRAMS = {}
 
 class BusinessListScraper:
-    def __init__(self):
-        self.base_url = "https://www.businesslist.com.ng/category/small-business"
+    def __init__(self, cache_path='http_cache.sqlite', cache_ttl=24 * 3600, state_path=None, log_level=logging.INFO,
+                 site_url="https://www.businesslist.com.ng", category="small-business"):
+        self.site_url = site_url.rstrip('/')
+        self.base_url = self.category_url(category)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
-        # Setup detailed logging
-        logging.basicConfig(
-            filename='scraper.log',
-            level=logging.DEBUG,
-            format='%(asctime)s - %(levelname)s - %(message)s'
-        )
+        # Log to scraper.log from a background thread; pass log_level=logging.DEBUG for per-page detail
+        setup_logging('scraper.log', log_level)
         self.logger = logging.getLogger(__name__)
+        # Paces the serial crawl; starts at the old one-request-per-2s and adapts from there
+        self.throttle = AdaptiveThrottle(rate=0.5, concurrency=1, max_concurrency=1)
+        # Persistent response cache; pass cache_path=None to always hit the network
+        self.cache = ResponseCache(cache_path, ttl=cache_ttl) if cache_path else None
+        # Optional resumable crawl state; progress is only recorded once it has been saved
+        self.state = CrawlState(state_path) if state_path else None
+        self._unsaved_pages = []
+        self._unsaved_businesses = {}
+        self._page_items = {}
+        # Pages of the last crawl left for the next pass because a listing or business page couldn't be fetched
+        self.failed_pages = set()
+        self._sheet_sink = None
 
     def get_soup(self, url, retries=3):
         """Get BeautifulSoup object with retry mechanism"""
-        self.logger.debug(f"Attempting to fetch URL: {url}")
+        return BeautifulSoup(self.get_html(url, retries), 'html.parser')
+
+    def get_html(self, url, retries=3):
+        """Get page HTML, served from or revalidated against the response cache when possible"""
+        content, encoding = self.get_page(url, retries)
+        return content.decode(encoding, errors='replace')
+
+    def get_page(self, url, retries=3):
+        """Get the raw page body and its encoding, with the same caching and retries as get_html"""
+        self.logger.debug("Attempting to fetch URL: %s", url)
+        cached = self._cached_entry(url)
+        if cached and self.cache.is_fresh(cached):
+            self.logger.debug("Cache hit for URL: %s", url)
+            CACHE_HITS.inc()
+            return cached.content, 'utf-8'
+        headers = dict(self.headers, **self.cache.conditional_headers(cached)) if self.cache else self.headers
         
         for i in range(retries):
+            if i:
+                FETCH_RETRIES.inc()
+            self.throttle.wait_sync(url)
+            start = time.monotonic()
+            response = None
             try:
-                response = requests.get(url, headers=self.headers, timeout=30)
-                response.raise_for_status()
-                self.logger.debug(f"Successfully fetched URL: {url}")
-                return BeautifulSoup(response.text, 'html.parser')
+                response = requests.get(url, headers=headers, timeout=30)
+                elapsed = time.monotonic() - start
+                FETCH_SECONDS.observe(elapsed)
+                self.throttle.observe(url, elapsed, status=response.status_code,
+                                      retry_after=response.headers.get('Retry-After'))
+                page = self._handle_response(url, response, cached)
+                self.logger.debug("Successfully fetched URL: %s", url)
+                return page
             except Exception as e:
-                self.logger.error(f"Attempt {i+1} failed for URL {url}: {str(e)}")
+                FETCH_ERRORS.inc()
+                if response is None:
+                    # Timeouts and connection errors back the host off too
+                    self.throttle.observe(url, error=True)
+                self.logger.error("Attempt %d failed for URL %s: %s", i + 1, url, e)
                 if i == retries - 1:
                     raise
-                time.sleep(2 ** i)
+
+    def _cached_entry(self, url):
+        return self.cache.get(url) if self.cache else None
+
+    def _handle_response(self, url, response, cached):
+        """Turn a fetched response into (body, encoding), answering 304s from and storing 200s in the cache"""
+        if response.status_code == 304 and cached is not None:
+            self.logger.debug("Not modified: %s", url)
+            CACHE_REVALIDATED.inc()
+            self.cache.touch(url)
+            return cached.content, 'utf-8'
+        response.raise_for_status()
+        FETCH_BYTES.inc(len(response.content))
+        # Same encoding requests/httpx would use for response.text
+        encoding = response.encoding or getattr(response, 'apparent_encoding', None) or 'utf-8'
+        if self.cache:
+            self.cache.store(url, response.content, etag=response.headers.get('ETag'),
+                             last_modified=response.headers.get('Last-Modified'), encoding=encoding)
+        return response.content, encoding
 
     def extract_business_links(self, page_url):
         """Extract business links from a given page URL"""
         try:
-            self.logger.info(f"Starting to extract business links from {page_url}")
-            soup = self.get_soup(page_url)
-            
-            # Find all company divs with the correct class pattern
-            company_divs = soup.find_all('div', class_=lambda x: x and 'company with_img g_' in x)
-            self.logger.debug(f"Found {len(company_divs)} company divs")
-            
-            links = []
-            for company in company_divs:
-                # Find the link within h4 tag
-                link_elem = company.find('h4').find('a') if company.find('h4') else None
-                if link_elem and 'href' in link_elem.attrs:
-                    full_url = urljoin(self.base_url, link_elem['href'])
-                    links.append(full_url)
-                    self.logger.debug(f"Found business link: {full_url}")
-            
-            return links
+            self.logger.info("Starting to extract business links from %s", page_url)
+            return self.extract_links_from_html(*self.get_page(page_url))
                 
         except Exception as e:
-            self.logger.error(f"Error extracting business links: {str(e)}")
+            self.logger.error("Error extracting business links: %s", e)
             return []
+
+    def extract_links_from_html(self, html, encoding=None):
+        """Extract business links from listing page HTML (str, or bytes in `encoding`) with the compiled lxml extractor"""
+        with PARSE_LINKS_SECONDS.time():
+            links = extraction.extract_business_links(html, self.base_url, encoding)
+        self.logger.debug("Found %d business links", len(links))
+        return links
+
+    def parse_business_links(self, soup):
+        """Reference BeautifulSoup link extractor, kept for parity checks"""
+        # Find all company divs with the correct class pattern
+        company_divs = soup.find_all('div', class_=lambda x: x and 'company with_img g_' in x)
+        self.logger.debug("Found %d company divs", len(company_divs))
+        
+        links = []
+        for company in company_divs:
+            # Find the link within h4 tag
+            link_elem = company.find('h4').find('a') if company.find('h4') else None
+            if link_elem and 'href' in link_elem.attrs:
+                full_url = urljoin(self.base_url, link_elem['href'])
+                links.append(full_url)
+                self.logger.debug("Found business link: %s", full_url)
+        
+        return links
     
     def scrape_business_details(self, url):
         """Scrape details from individual business page"""
         try:
-            soup = self.get_soup(url)
-            
-            business_data = {
-                'Company Name': None,
-                'Location': None,
-                'Phone Number': None,
-                'Website URL': None,
-                'Company Size': None,      
-                'Primary Contact Name': None, 
-                'Contact Position':'Company Manager',
-                'Contact Source': 'BusinessList.com.ng',
-                 # Added field for Company Manager
-            }
-
-            # Company Name from h1
-            name_elem = soup.find('h1')
-            if name_elem:
-                business_data['Company Name'] = name_elem.text.strip().split(' - ')[0]
-                self.logger.debug(f"Found company name: {business_data['Company Name']}")
-
-            # Location - extract text from the div with id "company_address"
-            location_div = soup.find('div', id='company_address')
-            if location_div:
-                business_data['Location'] = location_div.text.strip()
-                self.logger.debug(f"Found location: {business_data['Location']}")
-
-            # Contact number
-            contact_div = soup.find('div', string=lambda x: x and 'Contact number' in str(x))
-            if contact_div and contact_div.find_next('div'):
-                business_data['Phone Number'] = contact_div.find_next('div').text.strip()
-                self.logger.debug(f"Found phone: {business_data['Phone Number']}")
-
-            # Mobile phone as alternate
-            mobile_div = soup.find('div', string=lambda x: x and 'Mobile phone' in str(x))
-            if mobile_div and mobile_div.find_next('div'):
-                if not business_data['Phone Number']:
-                    business_data['Phone Number'] = mobile_div.find_next('div').text.strip()
-
-            # Website Address
-            website_div = soup.find('div', string=lambda x: x and 'Website' in str(x))
-            if website_div and website_div.find_next('div'):
-                business_data['Website URL'] = website_div.find_next('div').text.strip()
-                self.logger.debug(f"Found website address: {business_data['Website URL']}")
-
-            # Company Size
-            try:
-                employees_div = soup.find('span', class_='label', string='Employees')
-                if employees_div and employees_div.parent:
-                    # Get the text after the "Company Size" label, which contains the count
-                    employees_text = employees_div.parent.get_text(strip=True)
-                    # Extract just the count part (e.g., "1-5") by removing "Company Size"
-                    employees_count = employees_text.replace('Employees', '').strip()
-                    
-                    # Determine company size category
-                    if '-' in employees_count:
-                        size_range = employees_count.split('-')
-                        if len(size_range) == 2:
-                            lower_bound = int(size_range[0])
-                            upper_bound = int(size_range[1])
-                            if upper_bound <= 50:
-                                business_data['Company Size'] = 'Small'
-                            elif 100 <= lower_bound <= 500:
-                                business_data['Company Size'] = 'Medium'
-                            elif lower_bound > 500:
-                                business_data['Company Size'] = 'Large'
-                            else:
-                                business_data['Company Size'] = 'Unknown'
-                        else:
-                            business_data['Company Size'] = 'Unknown'
-                    else:
-                        # Handle single number cases
-                        if int(employees_count) <= 50:
-                            business_data['Company Size'] = 'Small'
-                        elif 100 <= int(employees_count) <= 500:
-                            business_data['Company Size'] = 'Medium'
-                        elif int(employees_count) > 500:
-                            business_data['Company Size'] = 'Large'
-                        else:
-                            business_data['Company Size'] = 'Unknown'
-                    
-                    self.logger.debug(f"Found employees: {business_data['Company Size']}")
-            except Exception as e:
-                self.logger.error(f"Error extracting employees count: {str(e)}")
-                business_data['Company Size'] = None
+            content, encoding = self.get_page(url)
+            return self.extract_details_from_html(content, url, encoding)
 
-            # Primary Contact Name
-            try:
-                info_divs = soup.find_all('div', class_='info')
-                for div in info_divs:
-                    manager_label = div.find('span', class_='label', string='Company manager')
-                    if manager_label:
-                        # Get the text content after the span, which contains the manager's name
-                        manager_text = div.get_text(strip=True)
-                        # Remove the "Company manager" text to get just the name
-                        manager_name = manager_text.replace('Company manager', '').strip()
-                        business_data['Primary Contact Name'] = manager_name
-                        self.logger.debug(f"Found company manager: {business_data['Primary Contact Name']}")
-                        break
-            except Exception as e:
-                self.logger.error(f"Error extracting company manager: {str(e)}")
-                business_data['Primary Contact Name'] = None
+        except Exception as e:
+            self.logger.error("Error scraping business details from %s: %s", url, e)
+            return None
 
-            # Add debug logging
-            self.logger.debug(f"Scraped data for {url}: {business_data}")
-            
-            return business_data
+    def extract_details_from_html(self, html, url, encoding=None):
+        """Extract the business fields from page HTML in one pass with the compiled lxml extractor"""
+        with PARSE_DETAILS_SECONDS.time():
+            business_data = extraction.extract_business_details(html, encoding)
+        self.logger.debug("Scraped data for %s: %s", url, business_data)
+        return business_data
+
+    def parse_business_details(self, soup, url):
+        """Reference BeautifulSoup extractor; extract_details_from_html must match its output"""
+        business_data = {
+            'Company Name': None,
+            'Location': None,
+            'Phone Number': None,
+            'Website URL': None,
+            'Company Size': None,      
+            'Primary Contact Name': None, 
+            'Contact Position':'Company Manager',
+            'Contact Source': 'BusinessList.com.ng',
+             # Added field for Company Manager
+        }
+
+        # Company Name from h1
+        name_elem = soup.find('h1')
+        if name_elem:
+            business_data['Company Name'] = name_elem.text.strip().split(' - ')[0]
+            self.logger.debug("Found company name: %s", business_data['Company Name'])
 
+        # Location - extract text from the div with id "company_address"
+        location_div = soup.find('div', id='company_address')
+        if location_div:
+            business_data['Location'] = location_div.text.strip()
+            self.logger.debug("Found location: %s", business_data['Location'])
+
+        # Contact number
+        contact_div = soup.find('div', string=lambda x: x and 'Contact number' in str(x))
+        if contact_div and contact_div.find_next('div'):
+            business_data['Phone Number'] = contact_div.find_next('div').text.strip()
+            self.logger.debug("Found phone: %s", business_data['Phone Number'])
+
+        # Mobile phone as alternate
+        mobile_div = soup.find('div', string=lambda x: x and 'Mobile phone' in str(x))
+        if mobile_div and mobile_div.find_next('div'):
+            if not business_data['Phone Number']:
+                business_data['Phone Number'] = mobile_div.find_next('div').text.strip()
+
+        # Website Address
+        website_div = soup.find('div', string=lambda x: x and 'Website' in str(x))
+        if website_div and website_div.find_next('div'):
+            business_data['Website URL'] = website_div.find_next('div').text.strip()
+            self.logger.debug("Found website address: %s", business_data['Website URL'])
+
+        # Company Size: the raw employee count (e.g. "1-5"); sinks bucket it with records.bucket_sizes
+        employees_div = soup.find('span', class_='label', string='Employees')
+        if employees_div and employees_div.parent:
+            employees_text = employees_div.parent.get_text(strip=True)
+            business_data['Company Size'] = employees_text.replace('Employees', '').strip()
+            self.logger.debug("Found employees: %s", business_data['Company Size'])
+
+        # Primary Contact Name
+        try:
+            info_divs = soup.find_all('div', class_='info')
+            for div in info_divs:
+                manager_label = div.find('span', class_='label', string='Company manager')
+                if manager_label:
+                    # Get the text content after the span, which contains the manager's name
+                    manager_text = div.get_text(strip=True)
+                    # Remove the "Company manager" text to get just the name
+                    manager_name = manager_text.replace('Company manager', '').strip()
+                    business_data['Primary Contact Name'] = manager_name
+                    self.logger.debug("Found company manager: %s", business_data['Primary Contact Name'])
+                    break
         except Exception as e:
-            self.logger.error(f"Error scraping business details from {url}: {str(e)}")
-            return None
+            self.logger.error("Error extracting company manager: %s", e)
+            business_data['Primary Contact Name'] = None
+
+        # Add debug logging
+        self.logger.debug("Scraped data for %s: %s", url, business_data)
+        
+        return business_data
+
+
+    def category_url(self, category):
+        return f"{self.site_url}/category/{category}"
+
+    def discover_categories(self, index_url=None):
+        """Category slugs linked from the site's front page (or `index_url`)"""
+        index_url = index_url or f"{self.site_url}/"
+        content, encoding = self.get_page(index_url)
+        categories = extraction.extract_category_links(content, index_url, encoding)
+        self.logger.info("Found %d categories on %s", len(categories), index_url)
+        return categories
 
+    def discover_last_page(self, category):
+        """Number of the last listing page of a category, read from its first page's pagination"""
+        content, encoding = self.get_page(f"{self.category_url(category)}/1")
+        return extraction.extract_last_page(content, category, encoding)
 
-    def scrape_first_page(self):
-        """Scrape the first 15 pages of businesses"""
-        self.logger.info("Starting to scrape first 15 pages")
-        all_businesses = []
+    def scrape_pages(self, pages=range(1, 16), sink=None):
+        """Scrape listing `pages` of the category (the first 15 by default) one request at a time.
+
+        Each new or changed business is written to `sink` (a GoogleSheetSink by
+        default) as soon as it is scraped; the sink is flushed and progress
+        checkpointed every 5 pages. A page whose listing or any of whose business
+        pages can't be fetched is added to `failed_pages` and scraped again in the
+        next pass, as in crawl(). Returns the number of businesses written.
+        """
+        pages = list(pages)
+        self.logger.info("Starting to scrape %d pages of %s", len(pages), self.base_url)
+        sink = sink if sink is not None else GoogleSheetSink()
+        written = 0
+        self.failed_pages = set()
+        page_urls = self.start_crawl([f"{self.base_url}/{page}" for page in pages])
         
-        for page in range(1, 16): 
+        for page in pages:
             page_url = f"{self.base_url}/{page}"  # Construct the URL for each page
-            self.logger.info(f"Scraping page {page}: {page_url}")
+            if page_url not in page_urls:
+                self.logger.info("Skipping page %d, already done in this pass", page)
+                continue
+            self.logger.info("Scraping page %d: %s", page, page_url)
             
-            # Get business links from the current page
-            business_links = self.extract_business_links(page_url)
-            print(f"Found {len(business_links)} business links on page {page}:")
-            for link in business_links:
-                print(f"- {link}")
+            # Get business links from the current page; a page that can't be fetched stays pending
+            try:
+                self.logger.info("Starting to extract business links from %s", page_url)
+                business_links = self.extract_links_from_html(*self.get_page(page_url))
+            except Exception as e:
+                self.logger.error("Error extracting business links from %s, retrying it next pass: %s", page_url, e)
+                self.failed_pages.add(page_url)
+                continue
+            self.logger.info("Found %d business links on page %d", len(business_links), page)
             
-            # Scrape each business
+            # Scrape each business; a page with a business that can't be fetched is retried next pass
             for link in business_links:
                 try:
-                    print(f"\nScraping: {link}")
-                    business_data = self.scrape_business_details(link)
-                    if business_data:
-                        print(f"Scraped data: {business_data}")
-                        all_businesses.append(business_data)
-                    time.sleep(2)  # Sleep between requests to avoid hitting the website too hard
+                    try:
+                        content, encoding = self.get_page(link)
+                    except Exception as e:
+                        self.logger.error("Error scraping business details from %s: %s", link, e)
+                        self.failed_pages.add(page_url)
+                        continue
+                    business_data = self.extract_details_from_html(content, link, encoding)
+                    if business_data and self.is_new_or_changed(link, business_data):
+                        sink.write(business_data)
+                        written += 1
                 except Exception as e:
-                    print(f"Error processing {link}: {str(e)}")
+                    self.logger.error("Error processing %s: %s", link, e)
                     continue
+            if page_url not in self.failed_pages:
+                self._unsaved_pages.append(page_url)
             
-            # After every 5 pages, save to Google Sheets to reduce write requests
+            # After every 5 pages, make sure everything is saved and checkpoint
             if page % 5 == 0:
-                self.save_to_google_sheet(all_businesses)
-                all_businesses = []  # Clear the list after saving
+                sink.flush()
+                self.commit_progress()
 
-        # Save any remaining businesses after the loop
-        if all_businesses:
-            self.save_to_google_sheet(all_businesses)
+        sink.flush()
+        self.commit_progress()
+        return written
 
-    def save_to_google_sheet(self, businesses):
-        """Save scraped data to Google Sheets"""
-        # Define the scope and authenticate
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        creds = ServiceAccountCredentials.from_json_keyfile_name(r'C:\Users\ayo\Webscraping\elegant-moment-413814-6e8f42efa6fc.json', scope)
-        client = gspread.authorize(creds)
-
-        # Open the Google Sheet
-        sheet = client.open("ShopMammy Tracker").sheet1 
-
-        # Write header only if the sheet is empty
-        if not sheet.get_all_values():  # Check if the sheet is empty
-            header = ['Company Name', 'Location', 'Phone Number', 'Website URL', 'Company Size', 'Primary Contact Name', 'Contact Position', 'Contact Source']
-            sheet.append_row(header)
-
-        # Prepare data for batch writing
-        rows_to_write = []
-        for business in businesses:
-            row = [
-                business['Company Name'],
-                business['Location'],
-                business['Phone Number'],
-                business['Website URL'],
-                business['Company Size'],
-                business['Primary Contact Name'],
-                business['Contact Position'],
-                business['Contact Source']
-            ]
-            rows_to_write.append(row)
-
-        # Write all data at once
-        if rows_to_write:
-            sheet.append_rows(rows_to_write)  # Use append_rows for batch writing
+    # Old name; it has always scraped the first 15 pages, not just the first one
+    scrape_first_page = scrape_pages
+
+    def start_crawl(self, page_urls):
+        """Return the listing pages this run should visit, resuming from the crawl state if any"""
+        if not self.state:
+            return page_urls
+        pending = self.state.start(page_urls)
+        if len(pending) < len(page_urls):
+            self.logger.info("Resuming crawl: %d of %d pages left (last saved page: %s)",
+                             len(pending), len(page_urls), self.state.checkpoint('last_page'))
+        return pending
+
+    def is_new_or_changed(self, url, business_data):
+        """True unless the crawl state already holds this exact record for `url`"""
+        if not self.state:
+            return True
+        # Hash a BusinessRecord as its dict, so crawl() and scrape_pages agree on unchanged businesses
+        if isinstance(business_data, tuple):
+            business_data = dict(zip(extraction.BUSINESS_COLUMNS, business_data))
+        record_hash = CrawlState.record_hash(business_data)
+        if self._unsaved_businesses.get(url) == record_hash or self.state.is_unchanged(url, record_hash):
+            self.logger.debug("Unchanged business, skipping: %s", url)
+            return False
+        self._unsaved_businesses[url] = record_hash
+        return True
+
+    def commit_progress(self):
+        """Mark pages and businesses handled since the last call as saved in the crawl state"""
+        if self.state:
+            self.state.commit(self._unsaved_pages, self._unsaved_businesses, sorted(self.failed_pages))
+        self._unsaved_pages = []
+        self._unsaved_businesses = {}
+
+    async def fetch_html_async(self, client, throttle, url, retries=3):
+        """Async counterpart of get_html, sharing its response cache and retry policy"""
+        content, encoding = await self.fetch_page_async(client, throttle, url, retries)
+        return content.decode(encoding, errors='replace')
+
+    async def fetch_page_async(self, client, throttle, url, retries=3):
+        """Async counterpart of get_page"""
+        self.logger.debug("Attempting to fetch URL: %s", url)
+        cached = self._cached_entry(url)
+        if cached and self.cache.is_fresh(cached):
+            self.logger.debug("Cache hit for URL: %s", url)
+            CACHE_HITS.inc()
+            return cached.content, 'utf-8'
+        headers = self.cache.conditional_headers(cached) if self.cache else {}
+
+        for i in range(retries):
+            if i:
+                FETCH_RETRIES.inc()
+            response = None
+            try:
+                async with throttle.slot(url):
+                    start = time.monotonic()
+                    response = await client.get(url, headers=headers)
+                elapsed = time.monotonic() - start
+                FETCH_SECONDS.observe(elapsed)
+                throttle.observe(url, elapsed, status=response.status_code,
+                                 retry_after=response.headers.get('Retry-After'))
+                page = self._handle_response(url, response, cached)
+                self.logger.debug("Successfully fetched URL: %s", url)
+                return page
+            except Exception as e:
+                FETCH_ERRORS.inc()
+                if response is None:
+                    throttle.observe(url, error=True)
+                self.logger.error("Attempt %d failed for URL %s: %s", i + 1, url, e)
+                if i == retries - 1:
+                    raise
+
+    async def _run_parser(self, parse_pool, func, *args):
+        """Run a module-level extraction function inline or, when given a pool, in a worker process.
+
+        Inline runs are timed in parse_seconds; pooled runs in parse_roundtrip_seconds,
+        since from here the wait for a worker and the pickling can't be told apart from parsing.
+        """
+        key = (func.__name__, parse_pool is not None)
+        histogram = _PARSE_HISTOGRAMS.get(key)
+        if histogram is None:
+            name = 'parse_roundtrip_seconds' if parse_pool is not None else 'parse_seconds'
+            histogram = _PARSE_HISTOGRAMS[key] = metrics.histogram(name, parser=func.__name__)
+        with histogram.time():
+            if parse_pool is None:
+                return func(*args)
+            return await asyncio.get_running_loop().run_in_executor(parse_pool, func, *args)
+
+    async def extract_business_links_async(self, client, throttle, page_url, parse_pool=None):
+        """Async counterpart of extract_business_links; fetch errors are raised, not turned into no links"""
+        self.logger.info("Starting to extract business links from %s", page_url)
+        content, encoding = await self.fetch_page_async(client, throttle, page_url)
+        links = await self._run_parser(parse_pool, extraction.extract_business_links,
+                                       content, self.base_url, encoding)
+        self.logger.debug("Found %d business links", len(links))
+        return links
+
+    def _page_item_done(self, page_url):
+        """Count one business of a listing page as handled; the page is complete once all are"""
+        self._page_items[page_url] -= 1
+        if self._page_items[page_url] == 0:
+            del self._page_items[page_url]
+            if page_url not in self.failed_pages:
+                self._unsaved_pages.append(page_url)
+
+    async def crawl(self, pages, sink, concurrency=10, per_host=4, rate=5.0, adaptive=True,
+                    parse_workers=0, queue_size=100, checkpoint_every=100, category=None):
+        """Stream listing pages -> business URLs -> fetched pages -> records -> `sink`.
+
+        The stages run concurrently over one pooled client and are connected by queues
+        of at most `queue_size` items, so memory stays flat however large the crawl.
+        Every new or changed record is passed to `sink.write` as soon as it is parsed;
+        every `checkpoint_every` records the sink is flushed and crawl progress
+        committed. `concurrency` caps in-flight requests overall. `per_host` and `rate`
+        are the starting per-host concurrency and requests per second; with `adaptive`
+        they are tuned at runtime from latency and 429/503 feedback. With
+        `parse_workers` > 0, HTML parsing runs in a process pool of that size.
+        `category` crawls that category's listing pages instead of base_url's.
+        A page whose listing or any of whose business pages couldn't be fetched is
+        added to `failed_pages` and crawled again in the next pass. Returns the number of records written.
+        """
+        base_url = self.category_url(category) if category else self.base_url
+        page_urls = self.start_crawl([f"{base_url}/{page}" for page in pages])
+        throttle = AdaptiveThrottle(rate=rate, concurrency=per_host, global_concurrency=concurrency,
+                                    max_rate=max(rate, 4 * rate), max_concurrency=concurrency,
+                                    adaptive=adaptive)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        parse_pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+        self._page_items = {}
+        self.failed_pages = set()
+        written = 0
+        since_checkpoint = 0
+
+        async def checkpoint():
+            # The sink may block on network I/O, so keep it off the event loop
+            await asyncio.to_thread(sink.flush)
+            self.commit_progress()
+
+        try:
+            async with httpx.AsyncClient(headers=self.headers, timeout=30, limits=limits,
+                                         follow_redirects=True) as client:
+
+                async def listing(page_url):
+                    try:
+                        links = await self.extract_business_links_async(client, throttle, page_url, parse_pool)
+                    except Exception as e:
+                        # Not done: the crawl state retries the page in the next pass
+                        self.logger.error("Error extracting business links from %s, retrying it next pass: %s",
+                                          page_url, e)
+                        self.failed_pages.add(page_url)
+                        return None
+                    self.logger.info("Found %d business links on %s", len(links), page_url)
+                    if not links:
+                        self._unsaved_pages.append(page_url)
+                        return None
+                    self._page_items[page_url] = len(links)
+                    return [(page_url, link) for link in links]
+
+                async def fetch(item):
+                    page_url, link = item
+                    try:
+                        content, encoding = await self.fetch_page_async(client, throttle, link)
+                    except Exception as e:
+                        self.logger.error("Error scraping business details from %s: %s", link, e)
+                        self.failed_pages.add(page_url)
+                        self._page_item_done(page_url)
+                        return None
+                    return [(page_url, link, content, encoding)]
+
+                async def parse(item):
+                    page_url, link, content, encoding = item
+                    try:
+                        record = await self._run_parser(parse_pool, extraction.extract_business_record,
+                                                        content, encoding)
+                    except Exception as e:
+                        self.logger.error("Error scraping business details from %s: %s", link, e)
+                        self._page_item_done(page_url)
+                        return None
+                    self.logger.debug("Scraped data for %s: %s", link, record)
+                    return [(page_url, link, record)]
+
+                async def deliver(item):
+                    nonlocal written, since_checkpoint
+                    page_url, link, record = item
+                    if self.is_new_or_changed(link, record):
+                        await asyncio.to_thread(sink.write, record)
+                        written += 1
+                        since_checkpoint += 1
+                    self._page_item_done(page_url)
+                    if since_checkpoint >= checkpoint_every:
+                        await checkpoint()
+                        since_checkpoint = 0
+
+                stages = [
+                    Stage('listings', listing, workers=concurrency),
+                    Stage('fetch', fetch, workers=concurrency),
+                    Stage('parse', parse, workers=2 * parse_workers if parse_workers > 0 else 1),
+                ]
+                await run_pipeline(page_urls, stages, deliver, maxsize=queue_size)
+            await checkpoint()
+        finally:
+            if parse_pool is not None:
+                parse_pool.shutdown(cancel_futures=True)
+        self.logger.info("Final throttle state: %s", throttle.snapshot())
+        return written
+
+    def work(self, queue, worker, sink, shard_pages=10, poll=5.0, **crawl_options):
+        """Claim and process shards from the WorkQueue `queue` until none are left.
+
+        A category shard reads the category's last page and queues its listing pages
+        in shards of `shard_pages`; a page shard is crawled with crawl(), passing
+        `crawl_options` through; it fails, to be retried, if any of its pages had
+        fetch errors. The shard's lease is renewed in the background while it runs.
+        When nothing is claimable but other workers still hold shards, the worker
+        polls every `poll` seconds, since they may queue more work or die and leave
+        theirs to be taken over. Returns the number of records written.
+        """
+        written = 0
+        while True:
+            shard = queue.claim(worker)
+            if shard is None:
+                if not queue.has_work():
+                    return written
+                time.sleep(poll)
+                continue
+            self.logger.info("Worker %s claimed %r (attempt %d)", worker, shard, shard.attempts)
+            heartbeat = queue.heartbeat(shard, worker)
+            try:
+                if shard.kind == 'category':
+                    last_page = self.discover_last_page(shard.category)
+                    queued = queue.add_pages(shard.category, last_page, shard_pages)
+                    self.logger.info("Category %s has %d pages, queued %d shards", shard.category, last_page, queued)
+                else:
+                    written += asyncio.run(self.crawl(shard.pages, sink, category=shard.category, **crawl_options))
+                    if self.failed_pages:
+                        raise RuntimeError(f"{len(self.failed_pages)} of {len(shard.pages)} pages had fetch errors")
+            except Exception as e:
+                self.logger.error("Worker %s failed %r: %s", worker, shard, e)
+                queue.fail(shard, worker, e)
+            else:
+                queue.complete(shard, worker)
+            finally:
+                heartbeat.stop()
+            if heartbeat.lost:
+                self.logger.warning("Worker %s lost the lease on %r to another worker", worker, shard)
+
+    def check_parity(self, paths=None):
+        """Compare the compiled extractor with the BeautifulSoup reference on saved pages.
+
+        `paths` are .html files or directories of them; without paths every page in the
+        response cache is checked. Returns the list of (source, kind) pairs that differ.
+        """
+        mismatches = []
+        checked = 0
+        for source, html in self._saved_pages(paths):
+            soup = BeautifulSoup(html, 'html.parser')
+            checks = (
+                ('links', self.parse_business_links(soup), self.extract_links_from_html(html)),
+                ('details', self.parse_business_details(soup, source), self.extract_details_from_html(html, source)),
+            )
+            for kind, expected, actual in checks:
+                if expected != actual:
+                    mismatches.append((source, kind))
+                    print(f"Mismatch in {kind} for {source}:\n  expected {expected}\n  got      {actual}")
+            checked += 1
+        print(f"Checked {checked} pages, {len(mismatches)} mismatches")
+        return mismatches
 
+    def _saved_pages(self, paths):
+        if not paths:
+            if self.cache:
+                yield from self.cache.items()
+            return
+        for path in paths:
+            files = sorted(glob.glob(os.path.join(path, '*.html'))) if os.path.isdir(path) else [path]
+            for file_path in files:
+                with open(file_path, encoding='utf-8') as f:
+                    yield file_path, f.read()
+
+    def save_to_google_sheet(self, businesses):
+        """Save scraped data to Google Sheets through a long-lived GoogleSheetSink"""
+        if self._sheet_sink is None:
+            self._sheet_sink = GoogleSheetSink()
+        self._sheet_sink.write_many(businesses)
+        self._sheet_sink.flush()
         print("Data successfully saved to Google Sheets.")
-def main():
+
+
+def _make_scraper(args):
+    return BusinessListScraper(
+        cache_path=None if args.no_cache else args.cache,
+        cache_ttl=float('inf') if args.offline else args.cache_ttl,
+        state_path=None if args.no_state else args.state,
+        log_level=getattr(logging, args.log_level),
+        site_url=args.site,
+        category=args.category,
+    )
+
+
+def _make_sink(args, suffix=''):
+    if args.sink == 'sheets':
+        client = FakeSheetsClient(f"{args.fake_sheets}{suffix}") if args.fake_sheets else None
+        return open_sink('sheets', client=client)
+    return open_sink(args.sink, f"{args.output}{suffix}.{args.sink}")
+
+
+def crawl_shards(scraper, args):
+    """Queue the categories to crawl (unless joining as --worker) and run --workers workers on the queue"""
+    queue = WorkQueue(args.queue, lease=args.lease)
+    if not args.worker:
+        categories = args.categories or scraper.discover_categories(args.categories_url)
+        if queue.stats() and not queue.has_work():
+            queue.new_pass()
+            print(f"Previous pass over {args.queue} is finished, starting a new one")
+        queued = queue.add_categories(categories)
+        print(f"Queued {queued} new of {len(categories)} categories in {args.queue}")
+    if args.workers > 1:
+        # Spawned rather than forked: a forked child inherits the log queue handler but not
+        # the listener thread that drains it, so its log records would be lost
+        context = multiprocessing.get_context('spawn')
+        workers = [context.Process(target=_worker_process, args=(args,)) for _ in range(args.workers)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    else:
+        run_worker(args, scraper)
+    print(f"Shards by state: {queue.stats()}")
+    queue.close()
+
+
+def _worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _worker_process(args):
+    """Entry point of a --workers process: run_worker, with its metrics dumped to <--metrics>-<worker>"""
+    metrics_path = f"{args.metrics}-{_worker_id()}" if args.metrics else None
+    metrics.dump_on_signal(metrics_path, args.metrics_format)
+    try:
+        run_worker(args)
+    finally:
+        if args.metrics:
+            metrics.REGISTRY.dump(metrics_path, args.metrics_format)
+
+
+def run_worker(args, scraper=None):
+    """Work through the shards in args.queue with a scraper of its own unless one is given"""
+    scraper = scraper or _make_scraper(args)
+    worker = _worker_id()
+    queue = WorkQueue(args.queue, lease=args.lease)
+    # Workers on one machine each get their own output or fake sheets file
+    sink = _make_sink(args, suffix=f"-{worker}")
+    try:
+        written = scraper.work(queue, worker, sink, shard_pages=args.shard_pages,
+                               concurrency=args.concurrency, per_host=args.per_host, rate=args.rate,
+                               adaptive=not args.fixed_rate, parse_workers=args.parse_workers)
+        sink.close()
+    finally:
+        queue.close()
+    print(f"Worker {worker} saved {written} new or changed businesses")
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape small businesses from businesslist.com.ng")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="Fetch listing and business pages concurrently")
+    parser.add_argument('--pages', type=int, default=15, help="Number of listing pages to scrape")
+    parser.add_argument('--site', default="https://www.businesslist.com.ng", help="Site to scrape")
+    parser.add_argument('--category', default="small-business", help="Category to scrape")
+    parser.add_argument('--all-categories', action='store_true',
+                        help="Discover every category and its page count and crawl them all in shards "
+                             "through the --queue work queue")
+    parser.add_argument('--categories', nargs='+', metavar='SLUG',
+                        help="Like --all-categories, but for just these categories")
+    parser.add_argument('--categories-url', metavar='URL',
+                        help="Page listing the categories (default: the site's front page)")
+    parser.add_argument('--worker', action='store_true',
+                        help="Only work on shards already in --queue, e.g. from another process or machine")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes to start for sharded crawls")
+    parser.add_argument('--queue', default='work_queue.sqlite', help="Shared work queue file for sharded crawls. It persists between runs: "
+                             "a run resumes the unfinished shards of the last one, and only starts "
+                             "a new pass over every category once all shards are done or failed")
+    parser.add_argument('--shard-pages', type=int, default=10, help="Listing pages per shard")
+    parser.add_argument('--lease', type=float, default=300.0,
+                        help="Seconds a worker holds a shard without renewing before others may take it over")
+    parser.add_argument('--concurrency', type=int, default=10, help="Max in-flight requests (async mode)")
+    parser.add_argument('--per-host', type=int, default=4, help="Starting in-flight requests per host (async mode)")
+    parser.add_argument('--rate', type=float, default=5.0, help="Starting requests per second per host (async mode)")
+    parser.add_argument('--fixed-rate', action='store_true',
+                        help="Keep --rate and --per-host fixed instead of adapting them (async mode)")
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help="Parse pages in a pool of this many processes (async mode, 0 parses inline)")
+    parser.add_argument('--cache', default='http_cache.sqlite', help="Response cache file")
+    parser.add_argument('--cache-ttl', type=float, default=24 * 3600,
+                        help="Seconds before a cached page is revalidated with the site")
+    parser.add_argument('--no-cache', action='store_true', help="Always fetch pages from the network")
+    parser.add_argument('--offline', action='store_true',
+                        help="Treat every cached page as fresh, e.g. when iterating on the parser")
+    parser.add_argument('--state', default='crawl_state.sqlite',
+                        help="Crawl state file used to resume and to skip unchanged businesses")
+    parser.add_argument('--no-state', action='store_true', help="Crawl everything from scratch")
+    parser.add_argument('--sink', choices=['sheets', 'csv', 'jsonl', 'sqlite', 'parquet'], default='sheets',
+                        help="Where scraped records go")
+    parser.add_argument('--output', default='businesses',
+                        help="Output file for local sinks (the extension is added for you)")
+    parser.add_argument('--fake-sheets', metavar='PATH',
+                        help="Write to a local JSON-backed stand-in for Google Sheets instead of the real one "
+                             "(PATH-<worker> for each worker of a sharded crawl)")
+    parser.add_argument('--check-parity', nargs='*', metavar='PATH',
+                        help="Check the compiled extractor against the BeautifulSoup one on saved "
+                             "pages (.html files or directories; defaults to the response cache) and exit")
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="Level for scraper.log; DEBUG logs every fetch and record")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="Write fetch, parse, pipeline and sink metrics to PATH at the end of the run "
+                             "(and on SIGUSR1; stderr when not given); --workers processes write PATH-<worker>")
+    parser.add_argument('--metrics-format', choices=['json', 'prometheus'], default='json',
+                        help="Format for --metrics and SIGUSR1 dumps")
+    args = parser.parse_args(argv)
+    metrics.dump_on_signal(args.metrics, args.metrics_format)
+
     # Initialize scraper
-    scraper = BusinessListScraper()
+    scraper = _make_scraper(args)
+
+    if args.check_parity is not None:
+        mismatches = scraper.check_parity(args.check_parity)
+        raise SystemExit(1 if mismatches else 0)
+
+    if args.all_categories or args.categories or args.worker:
+        try:
+            crawl_shards(scraper, args)
+        finally:
+            if args.metrics:
+                metrics.REGISTRY.dump(args.metrics, args.metrics_format)
+        return
     
+    sink = _make_sink(args)
     try:
-        # Start scraping only first page
-        print("Starting scrape of first page...")
-        businesses = scraper.scrape_first_page()
-        
-        # Print results before saving
-        print(f"Found {len(businesses)} businesses")
+        if args.use_async:
+            print(f"Starting concurrent scrape of {args.pages} pages...")
+            written = asyncio.run(scraper.crawl(
+                range(1, args.pages + 1),
+                sink,
+                concurrency=args.concurrency,
+                per_host=args.per_host,
+                rate=args.rate,
+                adaptive=not args.fixed_rate,
+                parse_workers=args.parse_workers,
+            ))
+        else:
+            print(f"Starting scrape of {args.pages} pages...")
+            written = scraper.scrape_pages(range(1, args.pages + 1), sink)
+        sink.close()
         
-        # Save results to Google Sheets
-        if businesses:
-            scraper.save_to_google_sheet(businesses)  # Call the new method to save to Google Sheets
+        if written:
+            print(f"Saved {written} new or changed businesses")
         else:
             print("No businesses found to save!")
         
     except Exception as e:
         print(f"An error occurred: {str(e)}")
-        logging.error(f"Critical error in main: {str(e)}")
+        logging.error("Critical error in main: %s", e)
+    finally:
+        if args.metrics:
+            metrics.REGISTRY.dump(args.metrics, args.metrics_format)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,50 @@
+import zlib
+
+from bench import fixtures
+from fake_sheets import FakeSheetsClient
+from sinks import SPREADSHEET
+
+# Rough town centres, so qualification sees a realistic mix of near and far businesses
+TOWN_COORDS = {
+    "akoka": (6.5244, 3.3920), "yaba": (6.5095, 3.3711), "ikeja": (6.6018, 3.3515),
+    "surulere": (6.4969, 3.3481), "bodija": (7.4352, 3.9133), "mokola": (7.4043, 3.8921),
+    "wuse": (9.0765, 7.4894), "garki": (9.0333, 7.4833), "sabon gari": (12.0022, 8.5300),
+    "gra": (4.8156, 7.0498),
+}
+
+
+class FakeLocation:
+    __slots__ = ('latitude', 'longitude')
+
+    def __init__(self, latitude, longitude):
+        self.latitude = latitude
+        self.longitude = longitude
+
+
+class FakeGeocoder:
+    """Offline backend for geocoding.Geocoder with geopy's geocode(query) interface.
+
+    Known towns resolve near their centre, jittered per query; anything else resolves
+    to a deterministic point somewhere in Nigeria. `calls` counts lookups.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def geocode(self, query):
+        self.calls += 1
+        town = query.split(',')[0].strip().lower()
+        crc = zlib.crc32(query.encode('utf-8'))
+        jitter = ((crc & 0xffff) / 0xffff - 0.5) * 0.02, ((crc >> 16) / 0xffff - 0.5) * 0.02
+        if town in TOWN_COORDS:
+            latitude, longitude = TOWN_COORDS[town]
+        else:
+            latitude, longitude = 4.5 + (crc % 900) / 100, 3.0 + (crc // 900 % 1000) / 100
+        return FakeLocation(latitude + jitter[0], longitude + jitter[1])
+
+
+def tracker_client(rows, **kwargs):
+    """FakeSheetsClient whose tracker sheet holds `rows` synthesized businesses"""
+    client = FakeSheetsClient(**kwargs)
+    client.open(SPREADSHEET).sheet1.rows = fixtures.tracker_rows(rows)
+    return client
@@ -0,0 +1,131 @@
+import glob
+import os
+import random
+import zlib
+
+# Deterministic stand-ins for businesslist.com.ng and Google results pages. The markup
+# follows the structure the extractors rely on and is padded with the navigation,
+# scripts and boilerplate real pages carry, so parse timings are representative.
+
+TOWNS = [
+    ("Akoka", "Lagos"), ("Yaba", "Lagos"), ("Ikeja", "Lagos"), ("Surulere", "Lagos"),
+    ("Bodija", "Oyo"), ("Mokola", "Oyo"), ("Wuse", "FCT"), ("Garki", "FCT"),
+    ("Sabon Gari", "Kano"), ("GRA", "Rivers"),
+]
+WORDS = ["Prime", "Golden", "Royal", "Unity", "Crest", "Delta", "Apex", "Zenith", "Harvest", "Beacon",
+         "Ventures", "Enterprises", "Stores", "Services", "Concepts", "Logistics", "Foods", "Textiles"]
+EMPLOYEES = ["1-10", "11-50", "51-99", "100-500", "500+", ""]
+NAMES = ["Ada Obi", "Tunde Bakare", "Ngozi Eze", "Musa Bello", "Funke Adeyemi", "Chidi Okafor"]
+
+BOILERPLATE = (
+    '<div class="nav">' + ''.join(f'<a href="/category/{w.lower()}">{w}</a>' for w in WORDS) + '</div>'
+    '<script>window.dataLayer = window.dataLayer || [];' + 'function gtag(){dataLayer.push(arguments);}' * 20 + '</script>'
+    '<style>' + '.company h4 a { color: #036; } .info .label { font-weight: bold; }' * 30 + '</style>'
+)
+FOOTER = '<div class="footer">' + '<p>Businesslist is a directory of businesses in Nigeria.</p>' * 15 + '</div>'
+
+
+def _rng(kind, number, seed):
+    return random.Random(f"{kind}:{number}:{seed}")
+
+
+def company_name(company_id, seed=0):
+    rng = _rng('company', company_id, seed)
+    return f"{rng.choice(WORDS[:10])} {rng.choice(WORDS[10:])} {company_id}"
+
+
+def index_page(categories):
+    """A front page linking to each category's listing"""
+    links = ''.join(f'<li><a href="/category/{category}">{category}</a></li>' for category in categories)
+    return f'<html><head><title>Categories</title></head><body>{BOILERPLATE}<ul>{links}</ul>{FOOTER}</body></html>'
+
+
+def listing_page(page, per_page=20, last_page=50, seed=0, category='small-business'):
+    """A category listing page linking to `per_page` business pages"""
+    companies = []
+    for i in range(per_page):
+        company_id = page * 1000 + i
+        rng = _rng('listing', company_id, seed)
+        town, _ = rng.choice(TOWNS)
+        classes = "company with_img g_0" if rng.random() < 0.8 else "company g_1"
+        companies.append(
+            f'<div class="{classes}"><h4><a href="/company/{company_id}/biz-{company_id}">'
+            f'{company_name(company_id, seed)}</a></h4><div class="address">{town}</div>'
+            f'<div class="desc">{" ".join(rng.choices(WORDS, k=30))}</div></div>'
+        )
+    pages = ''.join(f'<a class="page_no" href="/category/{category}/{n}">{n}</a>'
+                    for n in range(max(1, page - 3), min(last_page, page + 3) + 1))
+    pages += f'<a class="page_no" href="/category/{category}/{last_page}">{last_page}</a>'
+    return (f'<html><head><title>Small business - page {page}</title></head><body>{BOILERPLATE}'
+            f'<div class="companies">{"".join(companies)}</div>'
+            f'<div class="pages_container">{pages}</div>{FOOTER}</body></html>')
+
+
+def detail_page(company_id, seed=0):
+    """A business page with the fields extract_business_details reads"""
+    rng = _rng('detail', company_id, seed)
+    town, state = rng.choice(TOWNS)
+    name = company_name(company_id, seed)
+    phone = f"080{rng.randint(10000000, 99999999)}"
+    info = [
+        f'<div class="info"><div class="label">Address</div><div id="company_address">'
+        f' {rng.randint(1, 200)} {rng.choice(WORDS)} Street, {town}, {state} </div></div>',
+        f'<div class="info"><div class="label">Contact number</div><div class="text"> {phone} </div></div>',
+    ]
+    if rng.random() < 0.5:
+        info.append(f'<div class="info"><div class="label">Mobile phone</div>'
+                    f'<div class="text">081{rng.randint(10000000, 99999999)}</div></div>')
+    if rng.random() < 0.6:
+        info.append(f'<div class="info"><div class="label">Website address</div><div class="text">'
+                    f'<a href="http://biz{company_id}.ng">biz{company_id}.ng</a></div></div>')
+    info.append(f'<div class="info"><span class="label">Employees</span>{rng.choice(EMPLOYEES)}</div>')
+    info.append(f'<div class="info"><span class="label">Company manager</span> {rng.choice(NAMES)}</div>')
+    reviews = ''.join(f'<div class="review"><p>{" ".join(rng.choices(WORDS, k=40))}</p></div>' for _ in range(30))
+    return (f'<html><head><title>{name}</title></head><body>{BOILERPLATE}'
+            f'<h1>{name} - {town}, Nigeria</h1>{"".join(info)}<div class="reviews">{reviews}</div>'
+            f'{FOOTER}</body></html>')
+
+
+def serp_page(query, results=10, seed=0):
+    """A Google results page with `results` snippet blocks, most of them naming a CEO"""
+    rng = _rng('serp', query, seed)
+    blocks = []
+    for i in range(results):
+        snippet = (f'<span>{rng.choice(NAMES)} is the CEO of {query.split()[-1]}. '
+                   f'{" ".join(rng.choices(WORDS, k=20))}</span>') if rng.random() < 0.7 else ''
+        blocks.append(f'<div class="MjjYud"><div class="g"><h3>Result {i}</h3>'
+                      f'<div class="VwiC3b yXK7lf lVm3ye r025kc hJNv6b Hdw6tb">{snippet}</div></div></div>')
+    # Real results pages are mostly inline script and style
+    padding = '<script>' + 'var _g={kEI:"abc",kEXPI:"0,1,2,3"};' * 400 + '</script>'
+    return f'<html><head><title>{query}</title>{padding}</head><body>{"".join(blocks)}{padding}</body></html>'
+
+
+def tracker_rows(count, seed=0):
+    """Tracker sheet rows (header first) in the layout qualify_leads reads"""
+    rng = random.Random(f"tracker:{seed}")
+    rows = [['Company Name', 'Location', 'State', 'Contact Phone Number', 'Website', 'Company Size',
+             'Contact Person Name', 'Contact Person Position', 'Contact Source']]
+    for i in range(count):
+        town, state = rng.choice(TOWNS)
+        rows.append([company_name(i, seed), f"{rng.randint(1, 200)} Street, {town}, {state}", state,
+                     f"080{rng.randint(10000000, 99999999)}", f"http://biz{i}.ng", rng.choice(EMPLOYEES),
+                     rng.choice(NAMES), 'CEO', 'businesslist'])
+    return rows
+
+
+class RecordedPages:
+    """Pages recorded from the real sites, served in rotation instead of synthesized ones.
+
+    `directory` holds listing*.html, detail*.html and serp*.html files; a kind with
+    no recordings falls back to the synthesized page.
+    """
+
+    def __init__(self, directory):
+        self.pages = {}
+        for kind in ('listing', 'detail', 'serp'):
+            paths = sorted(glob.glob(os.path.join(directory, f'{kind}*.html')))
+            self.pages[kind] = [open(path, 'rb').read() for path in paths]
+
+    def get(self, kind, number):
+        pages = self.pages.get(kind)
+        return pages[zlib.crc32(str(number).encode()) % len(pages)] if pages else None
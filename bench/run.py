@@ -0,0 +1,251 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from timeit import timeit
+
+from selectolax.parser import HTMLParser
+
+import extraction
+import google_search
+from bench import fixtures
+from bench.fakes import FakeGeocoder, tracker_client
+from bench.server import ServerProcess
+from fake_sheets import FakeSheetsClient
+from geocoding import GeocodeCache, Geocoder
+from qualify_leads import qualify_leads
+from records import BusinessCleaner
+from Scraper_script import BusinessListScraper
+from sinks import GoogleSheetSink, open_sink
+
+try:
+    import resource
+except ImportError:
+    # POSIX only; peak RSS is reported as None elsewhere, e.g. on Windows
+    resource = None
+
+# Metrics where a smaller number is an improvement; everything else is a rate
+LOWER_IS_BETTER = ('_us', '_ms', '_mb', '_seconds')
+
+
+def percentile(samples, q):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def per_page_us(func, pages, repeat):
+    """Best-of-`repeat` mean microseconds for calling `func` on each page"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            func(page)
+        best = min(best, time.perf_counter() - start)
+    return round(best / len(pages) * 1e6, 1)
+
+
+def timed(coroutine_function, samples):
+    """Wrap a coroutine function so each call's duration is appended to `samples`"""
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await coroutine_function(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+    return wrapper
+
+
+def bench_parse(count, repeat):
+    """Parse cost per page of the extractors behind scrape_business_details and parse_result"""
+    details = [fixtures.detail_page(1000 + i).encode('utf-8') for i in range(count)]
+    listings = [fixtures.listing_page(1 + i).encode('utf-8') for i in range(count)]
+    serps = [fixtures.serp_page(f"CEO of biz{i}.ng") for i in range(count)]
+    base_url = "https://www.businesslist.com.ng/category/small-business"
+    return {
+        'parse.details_us': per_page_us(extraction.extract_business_details, details, repeat),
+        'parse.links_us': per_page_us(lambda page: extraction.extract_business_links(page, base_url),
+                                      listings, repeat),
+        'parse.serp_us': per_page_us(lambda page: google_search.parse_result(HTMLParser(page)), serps, repeat),
+    }
+
+
+def bench_crawl(server_url, pages, concurrency):
+    """Crawl `pages` listing pages and their business pages into a fake Sheets sink"""
+    scraper = BusinessListScraper(cache_path=None, site_url=server_url)
+    samples = []
+    scraper.fetch_page_async = timed(scraper.fetch_page_async, samples)
+    client = FakeSheetsClient()
+    sink = GoogleSheetSink(client=client)
+    start = time.perf_counter()
+    written = asyncio.run(scraper.crawl(range(1, pages + 1), sink, concurrency=concurrency,
+                                        per_host=concurrency, rate=10_000, adaptive=False))
+    sink.close()
+    elapsed = time.perf_counter() - start
+    return {
+        'crawl.pages_per_sec': round(len(samples) / elapsed, 1),
+        'crawl.records_per_sec': round(written / elapsed, 1),
+        'crawl.fetch_p50_ms': round(percentile(samples, 50) * 1000, 2),
+        'crawl.fetch_p99_ms': round(percentile(samples, 99) * 1000, 2),
+        'crawl.records': written,
+        'crawl.sheet_calls': client.calls,
+    }
+
+
+def bench_search(server_url, domains, concurrency):
+    """Look up `domains` synthesized domains against the stand-in search endpoint"""
+    google_search.SEARCH_URL = f"{server_url}/search"
+    samples = []
+    fetch = google_search.fetch_search_page
+    google_search.fetch_search_page = timed(fetch, samples)
+    results = []
+
+    async def collect(result):
+        results.append(result)
+
+    start = time.perf_counter()
+    try:
+        asyncio.run(google_search.lookup_domains((f"biz{i}.ng" for i in range(domains)), collect,
+                                                 concurrency=concurrency, rate=10_000, adaptive=False))
+    finally:
+        google_search.fetch_search_page = fetch
+    elapsed = time.perf_counter() - start
+    return {
+        'search.queries_per_sec': round(len(results) / elapsed, 1),
+        'search.fetch_p50_ms': round(percentile(samples, 50) * 1000, 2),
+        'search.fetch_p99_ms': round(percentile(samples, 99) * 1000, 2),
+        'search.errors': sum(1 for result in results if result.error),
+    }
+
+
+def bench_qualify(rows):
+    """Qualify `rows` tracker rows with a fake geocoder and fake Sheets backend"""
+    client = tracker_client(rows)
+    backend = FakeGeocoder()
+    geocoder = Geocoder(cache=GeocodeCache('bench_geocode.sqlite'), backend=backend, min_delay=0)
+    start = time.perf_counter()
+    qualify_leads(geocoder=geocoder, client=client, state_path='bench_leads.sqlite')
+    elapsed = time.perf_counter() - start
+    return {
+        'qualify.rows_per_sec': round(rows / elapsed, 1),
+        'qualify.geocoder_calls': backend.calls,
+        'qualify.sheet_calls': client.calls,
+    }
+
+
+def bench_sinks(rows):
+    """Rows per second through each sink, including the fake Sheets one, and the cost of cleaning them"""
+    records = [extraction.extract_business_record(fixtures.detail_page(1000 + i)) for i in range(min(rows, 500))]
+    batch = [extraction.extract_business_record(fixtures.detail_page(1000 + i)) for i in range(1000)]
+    results = {'sink.clean_1000_rows_ms': round(min(
+        timeit(lambda: BusinessCleaner().clean(batch), number=1) for _ in range(3)) * 1000, 2)}
+    # The same records are written over and over, so leave out cleaning and its deduplication
+    for kind in ('csv', 'jsonl', 'sqlite', 'sheets'):
+        if kind == 'sheets':
+            sink = open_sink('sheets', client=FakeSheetsClient(), clean=False)
+        else:
+            sink = open_sink(kind, f"bench_sink.{kind}", clean=False)
+        start = time.perf_counter()
+        for i in range(rows):
+            sink.write(records[i % len(records)])
+        sink.close()
+        results[f'sink.{kind}_rows_per_sec'] = round(rows / (time.perf_counter() - start), 1)
+    return results
+
+
+def compare(baseline, current):
+    """Print every metric of `current` next to `baseline` with the relative change"""
+    print(f"{'metric':32} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, value in current['metrics'].items():
+        old = baseline['metrics'].get(name)
+        if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+            print(f"{name:32} {str(old):>12} {str(value):>12}")
+            continue
+        change = (value - old) / old * 100
+        better = change < 0 if name.endswith(LOWER_IS_BETTER) else change > 0
+        marker = '' if abs(change) < 5 else (' +' if better else ' -')
+        print(f"{name:32} {old:>12} {value:>12} {change:>+8.1f}%{marker}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the scraper, search and qualification scripts")
+    parser.add_argument('--pages', type=int, default=5, help="Listing pages to crawl (20 businesses each)")
+    parser.add_argument('--domains', type=int, default=200, help="Domains to look up")
+    parser.add_argument('--rows', type=int, default=2000, help="Tracker rows to qualify and sink rows to write")
+    parser.add_argument('--parse-pages', type=int, default=50, help="Pages per parser timing run")
+    parser.add_argument('--repeat', type=int, default=3, help="Parser timing runs; the best is reported")
+    parser.add_argument('--concurrency', type=int, default=10, help="Requests in flight for crawl and search")
+    parser.add_argument('--latency', type=float, default=0.02, help="Seconds the stand-in server waits per request")
+    parser.add_argument('--jitter', type=float, default=0.01, help="Extra random latency, up to this many seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with a 500")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Share of requests answered with a 429")
+    parser.add_argument('--fixtures', metavar='DIR',
+                        help="Serve recorded listing*.html, detail*.html and serp*.html pages from DIR")
+    parser.add_argument('--only', nargs='+', choices=['parse', 'crawl', 'search', 'qualify', 'sinks'],
+                        help="Run only these benchmarks")
+    parser.add_argument('--output', metavar='PATH', help="Write the results as JSON to PATH")
+    parser.add_argument('--compare', metavar='PATH', help="Compare the results with an earlier --output file")
+    args = parser.parse_args(argv)
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    selected = set(args.only or ['parse', 'crawl', 'search', 'qualify', 'sinks'])
+
+    recorded = fixtures.RecordedPages(args.fixtures) if args.fixtures else None
+    metrics = {}
+    # Caches, state files and logs all go to a scratch directory
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='bench-') as scratch:
+        os.chdir(scratch)
+        try:
+            if 'parse' in selected:
+                metrics.update(bench_parse(args.parse_pages, args.repeat))
+            if selected & {'crawl', 'search'}:
+                with ServerProcess(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                   throttle_rate=args.throttle_rate, recorded=recorded) as server:
+                    if 'crawl' in selected:
+                        metrics.update(bench_crawl(server.url, args.pages, args.concurrency))
+                    if 'search' in selected:
+                        metrics.update(bench_search(server.url, args.domains, args.concurrency))
+            if 'qualify' in selected:
+                metrics.update(bench_qualify(args.rows))
+            if 'sinks' in selected:
+                metrics.update(bench_sinks(args.rows))
+            metrics['process.peak_rss_mb'] = peak_rss_mb()
+        finally:
+            # Leave the scratch directory before it is removed
+            os.chdir(cwd)
+
+    result = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': vars(args),
+        },
+        'metrics': metrics,
+    }
+    print(json.dumps(result, indent=2))
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    if baseline_path:
+        with open(baseline_path, encoding='utf-8') as f:
+            compare(json.load(f), result)
+    return result
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import multiprocessing
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from bench import fixtures
+
+LISTING_PATH = re.compile(r'^/category/([\w-]+)/(\d+)$')
+DETAIL_PATH = re.compile(r'^/company/(\d+)/')
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connection bursts and stalls clients in SYN retries
+    request_queue_size = 256
+
+
+class BenchServer:
+    """Local stand-in for businesslist.com.ng and Google search, run in a background thread.
+
+    Each response is delayed by `latency` seconds plus up to `jitter` more. A share
+    `error_rate` of requests fails with a 500 and a share `throttle_rate` with a 429
+    and Retry-After: 0. Pages come from `recorded` (a fixtures.RecordedPages) when it
+    has them and are synthesized otherwise. The front page links to `categories`,
+    each of which has `last_page` listing pages.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, recorded=None,
+                 last_page=50, seed=0, categories=('small-business',)):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.recorded = recorded
+        self.last_page = last_page
+        self.seed = seed
+        self.categories = categories
+        self.requests = 0
+        self.bytes_sent = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = _HTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    def page(self, path):
+        """Body for a request path, or None for an unknown path"""
+        parts = urlsplit(path)
+        match = LISTING_PATH.match(parts.path)
+        if match:
+            page = int(match.group(2))
+            return self._recorded('listing', page) or fixtures.listing_page(
+                page, last_page=self.last_page, seed=self.seed, category=match.group(1)).encode('utf-8')
+        match = DETAIL_PATH.match(parts.path)
+        if match:
+            company_id = int(match.group(1))
+            return self._recorded('detail', company_id) or fixtures.detail_page(
+                company_id, seed=self.seed).encode('utf-8')
+        if parts.path == '/':
+            return fixtures.index_page(self.categories).encode('utf-8')
+        if parts.path == '/search':
+            query = parse_qs(parts.query).get('q', [''])[0]
+            return self._recorded('serp', query) or fixtures.serp_page(query, seed=self.seed).encode('utf-8')
+        return None
+
+    def _recorded(self, kind, number):
+        return self.recorded.get(kind, number) if self.recorded else None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    roll = server._random.random()
+                    delay = server.latency + server._random.random() * server.jitter
+                if delay:
+                    time.sleep(delay)
+                if roll < server.error_rate:
+                    return self._send(500, b'')
+                if roll < server.error_rate + server.throttle_rate:
+                    return self._send(429, b'', {'Retry-After': '0'})
+                body = server.page(self.path)
+                if body is None:
+                    return self._send(404, b'')
+                self._send(200, body, {'Content-Type': 'text/html; charset=utf-8'})
+
+            def _send(self, status, body, headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.bytes_sent += len(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def _serve(ports, kwargs):
+    server = BenchServer(**kwargs)
+    ports.put(server._httpd.server_port)
+    server._httpd.serve_forever()
+
+
+class ServerProcess:
+    """A BenchServer in a child process, so serving pages doesn't compete for the GIL
+    with the code being measured. Takes the same arguments as BenchServer."""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.process = None
+        self.url = None
+
+    def __enter__(self):
+        context = multiprocessing.get_context('spawn')
+        ports = context.Queue()
+        self.process = context.Process(target=_serve, args=(ports, self.kwargs), daemon=True)
+        self.process.start()
+        self.url = f"http://127.0.0.1:{ports.get(timeout=30)}"
+        return self
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.join()
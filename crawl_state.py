@@ -0,0 +1,134 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+# frontier.done: a page is pending, saved, or failed in its pass and retried in the next
+PENDING, DONE, FAILED = 0, 1, 2
+
+
+class CrawlState:
+    """Durable crawl progress stored in SQLite.
+
+    Tracks the listing-page frontier, the business pages already saved together with
+    a hash of their extracted record, and named checkpoints. A run that stops half way
+    resumes from the pending pages; once every page it asks for is done or failed the
+    next run starts a new pass over them and only businesses whose record changed are
+    emitted again. Passes are tracked per set of pages asked for, so separate
+    categories or shards sharing one state file don't hold each other up.
+    """
+
+    def __init__(self, path='crawl_state.sqlite'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                page_url TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                done INTEGER NOT NULL DEFAULT 0,
+                pass INTEGER NOT NULL DEFAULT 1,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS seen (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                scraped_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                name TEXT PRIMARY KEY,
+                value TEXT,
+                updated_at REAL NOT NULL
+            );
+        """)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(frontier)")]
+        if 'pass' not in columns:
+            # State files from before passes were tracked
+            self.conn.execute("ALTER TABLE frontier ADD COLUMN pass INTEGER NOT NULL DEFAULT 1")
+        self.conn.commit()
+
+    @staticmethod
+    def record_hash(record):
+        """Stable hash of an extracted record, used to detect changed businesses"""
+        payload = json.dumps(record, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def start(self, page_urls):
+        """Seed the frontier with `page_urls` and return the ones still to crawl, in order.
+
+        Pages of `page_urls` left pending by an interrupted run are resumed; if none
+        are pending, because the previous pass over them finished (pages that failed
+        included), they are all queued again for a new incremental pass.
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO frontier (page_url, position, done, updated_at) VALUES (?, ?, ?, ?)",
+                [(url, position, PENDING, now) for position, url in enumerate(page_urls)],
+            )
+            status = self._column(page_urls, 'done')
+            if PENDING not in status.values():
+                self.conn.executemany(
+                    "UPDATE frontier SET done = ?, pass = pass + 1, updated_at = ? WHERE page_url = ?",
+                    [(PENDING, now, url) for url in page_urls],
+                )
+                status = dict.fromkeys(page_urls, PENDING)
+        return [url for url in page_urls if status[url] == PENDING]
+
+    def passes(self, page_urls):
+        """Number of the pass each of `page_urls` is in"""
+        return self._column(page_urls, 'pass')
+
+    def _column(self, page_urls, column):
+        values = {}
+        # In chunks, to stay under SQLite's limit on query parameters
+        for i in range(0, len(page_urls), 500):
+            chunk = page_urls[i:i + 500]
+            values.update(self.conn.execute(
+                f"SELECT page_url, {column} FROM frontier WHERE page_url IN ({', '.join('?' for _ in chunk)})",
+                chunk,
+            ))
+        return values
+
+    def is_unchanged(self, url, content_hash):
+        row = self.conn.execute("SELECT content_hash FROM seen WHERE url = ?", (url,)).fetchone()
+        return row is not None and row[0] == content_hash
+
+    def commit(self, page_urls, businesses, failed_urls=()):
+        """Record saved progress in one transaction.
+
+        `page_urls` are listing pages whose businesses have all been saved and
+        `businesses` maps each saved business URL to its record hash. `failed_urls`
+        are pages that couldn't be crawled; they are left out of the rest of this
+        pass and crawled again in the next one.
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE frontier SET done = ?, updated_at = ? WHERE page_url = ?",
+                [(DONE, now, url) for url in page_urls] + [(FAILED, now, url) for url in failed_urls],
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO seen (url, content_hash, scraped_at) VALUES (?, ?, ?)",
+                [(url, content_hash, now) for url, content_hash in businesses.items()],
+            )
+            if page_urls:
+                self._set_checkpoint('last_page', page_urls[-1], now)
+            self._set_checkpoint('last_commit', str(now), now)
+
+    def checkpoint(self, name):
+        row = self.conn.execute("SELECT value FROM checkpoints WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_checkpoint(self, name, value):
+        with self.conn:
+            self._set_checkpoint(name, value, time.time())
+
+    def _set_checkpoint(self, name, value, now):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO checkpoints (name, value, updated_at) VALUES (?, ?, ?)",
+            (name, value, now),
+        )
+
+    def close(self):
+        self.conn.close()
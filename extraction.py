@@ -0,0 +1,295 @@
+import re
+from typing import NamedTuple, Optional
+from urllib.parse import urljoin, urlsplit
+
+import lxml.html
+from lxml import etree
+
+# Text inside these tags is not part of get_text() in BeautifulSoup either
+_HIDDEN_TEXT_TAGS = frozenset(('script', 'style', 'template'))
+
+
+def _collect_text(el, parts, top):
+    if el.text and (top or el.tag not in _HIDDEN_TEXT_TAGS):
+        parts.append(el.text)
+    for child in el:
+        # Comments and processing instructions contribute their tail but not their text
+        if isinstance(child.tag, str):
+            _collect_text(child, parts, False)
+        if child.tail:
+            parts.append(child.tail)
+
+
+def element_text(el, strip=False):
+    """Text of an element, matching BeautifulSoup's .text / get_text(strip=True)"""
+    parts = []
+    _collect_text(el, parts, True)
+    if strip:
+        return ''.join(part.strip() for part in parts)
+    return ''.join(parts)
+
+
+def element_string(el):
+    """The element's single string, matching BeautifulSoup's Tag.string (None if it has several children)"""
+    if el.text:
+        return el.text if len(el) == 0 else None
+    if len(el) != 1:
+        return None
+    child = el[0]
+    if child.tail:
+        return None
+    if not isinstance(child.tag, str):
+        return child.text
+    return element_string(child)
+
+
+def has_class(el, css_class):
+    return css_class in (el.get('class') or '').split()
+
+
+class Field:
+    """Declarative rule for one field: the first element matching the selector yields its value.
+
+    The selector is a tag name plus optional `id`, `css_class`, `string_contains` /
+    `string_equals` (tested against the element's single string, like BeautifulSoup's
+    `string=`) and `within` (a (tag, class) ancestor the element must sit in).
+    `target` picks where the value is read from once an element matches:
+    'self', 'parent', 'within' (the outermost matching ancestor) or 'next:<tag>'
+    (the next element of that tag in document order). `strip_text` reads the text
+    like get_text(strip=True) and `clean` post-processes it.
+    """
+
+    __slots__ = ('name', 'tag', 'id', 'css_class', 'string_contains', 'string_equals', 'within',
+                 'target', 'next_tag', 'strip_text', 'clean')
+
+    def __init__(self, name, tag, id=None, css_class=None, string_contains=None, string_equals=None,
+                 within=None, target='self', strip_text=False, clean=None):
+        self.name = name
+        self.tag = tag
+        self.id = id
+        self.css_class = css_class
+        self.string_contains = string_contains
+        self.string_equals = string_equals
+        self.within = within
+        self.target = target
+        self.next_tag = target[len('next:'):] if target.startswith('next:') else None
+        self.strip_text = strip_text
+        self.clean = clean
+
+    def matches(self, el):
+        if self.id is not None and el.get('id') != self.id:
+            return False
+        if self.css_class is not None and not has_class(el, self.css_class):
+            return False
+        if self.string_contains is not None or self.string_equals is not None:
+            string = element_string(el)
+            if not string:
+                return False
+            if self.string_contains is not None and self.string_contains not in string:
+                return False
+            if self.string_equals is not None and string != self.string_equals:
+                return False
+        if self.within is not None and self._container(el) is None:
+            return False
+        return True
+
+    def _container(self, el):
+        tag, css_class = self.within
+        container = None
+        for ancestor in el.iterancestors(tag):
+            if has_class(ancestor, css_class):
+                container = ancestor
+        return container
+
+    def value(self, el):
+        if self.target == 'parent':
+            el = el.getparent()
+        elif self.target == 'within':
+            el = self._container(el)
+        text = element_text(el, strip=self.strip_text)
+        return self.clean(text) if self.clean else text
+
+
+class CompiledExtractor:
+    """A set of Fields compiled into a per-tag dispatch table and evaluated in one document pass"""
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self._by_tag = {}
+        for field in self.fields:
+            self._by_tag.setdefault(field.tag, []).append(field)
+
+    def extract(self, html, encoding=None):
+        """Return {field name: value} for every field found in `html`"""
+        results = {}
+        root = parse_html(html, encoding)
+        if root is None:
+            return results
+        waiting = []
+        for el in root.iter(etree.Element):
+            tag = el.tag
+            if waiting:
+                for field in [field for field in waiting if field.next_tag == tag]:
+                    results[field.name] = field.value(el)
+                    waiting.remove(field)
+            candidates = self._by_tag.get(tag)
+            if candidates:
+                for field in candidates:
+                    if field.name in results or field in waiting or not field.matches(el):
+                        continue
+                    if field.next_tag is not None:
+                        # Resolved by the next element of that tag, like find_next()
+                        waiting.append(field)
+                    else:
+                        results[field.name] = field.value(el)
+                if len(results) == len(self.fields):
+                    break
+        return results
+
+
+_parsers = {}
+
+
+def _parser_for(encoding):
+    parser = _parsers.get(encoding)
+    if parser is None:
+        parser = _parsers[encoding] = lxml.html.HTMLParser(encoding=encoding)
+    return parser
+
+
+def parse_html(html, encoding=None):
+    """Parse a page (str, or bytes in `encoding`) with lxml, returning None for an empty document.
+
+    Raw bytes are parsed directly, so callers that already hold the response body
+    never need to decode it first.
+    """
+    parser = None
+    if isinstance(html, str):
+        try:
+            return lxml.html.document_fromstring(html)
+        except ValueError:
+            # lxml refuses str input that carries an XML encoding declaration
+            html, parser = html.encode('utf-8'), _parser_for('utf-8')
+        except etree.ParserError:
+            return None
+    elif encoding is not None:
+        parser = _parser_for(encoding)
+    try:
+        return lxml.html.document_fromstring(html, parser=parser)
+    except etree.ParserError:
+        return None
+
+
+BUSINESS_FIELDS = (
+    Field('Company Name', 'h1', clean=lambda text: text.strip().split(' - ')[0]),
+    Field('Location', 'div', id='company_address', clean=str.strip),
+    Field('Phone Number', 'div', string_contains='Contact number', target='next:div', clean=str.strip),
+    Field('Mobile Phone', 'div', string_contains='Mobile phone', target='next:div', clean=str.strip),
+    Field('Website URL', 'div', string_contains='Website', target='next:div', clean=str.strip),
+    Field('Employees', 'span', css_class='label', string_equals='Employees', target='parent',
+          strip_text=True, clean=lambda text: text.replace('Employees', '').strip()),
+    Field('Primary Contact Name', 'span', css_class='label', string_equals='Company manager',
+          within=('div', 'info'), target='within', strip_text=True,
+          clean=lambda text: text.replace('Company manager', '').strip()),
+)
+
+business_extractor = CompiledExtractor(BUSINESS_FIELDS)
+
+
+BUSINESS_COLUMNS = ('Company Name', 'Location', 'Phone Number', 'Website URL', 'Company Size',
+                    'Primary Contact Name', 'Contact Position', 'Contact Source')
+
+
+class BusinessRecord(NamedTuple):
+    """One business, in BUSINESS_COLUMNS order.
+
+    A plain tuple, so it takes a fraction of a dict's memory and pickles small
+    between processes. `company_size` holds the raw employee count (e.g. '1-5')
+    until records.clean_businesses buckets it.
+    """
+    company_name: Optional[str]
+    location: Optional[str]
+    phone_number: Optional[str]
+    website_url: Optional[str]
+    company_size: Optional[str]
+    primary_contact_name: Optional[str]
+    contact_position: str = 'Company Manager'
+    contact_source: str = 'BusinessList.com.ng'
+
+
+def extract_business_record(html, encoding=None):
+    """BusinessRecord for a detail page"""
+    found = business_extractor.extract(html, encoding)
+    phone_number = found.get('Phone Number')
+    # Mobile phone as alternate
+    if not phone_number and 'Mobile Phone' in found:
+        phone_number = found['Mobile Phone']
+    return BusinessRecord(
+        company_name=found.get('Company Name'),
+        location=found.get('Location'),
+        phone_number=phone_number,
+        website_url=found.get('Website URL'),
+        company_size=found.get('Employees'),
+        primary_contact_name=found.get('Primary Contact Name'),
+    )
+
+
+def extract_business_details(html, encoding=None):
+    """Business record for a detail page as a dict; same output as BusinessListScraper.parse_business_details"""
+    return dict(zip(BUSINESS_COLUMNS, extract_business_record(html, encoding)))
+
+
+def extract_business_links(html, base_url, encoding=None):
+    """Absolute business page URLs from a listing page; same output as BusinessListScraper.parse_business_links"""
+    root = parse_html(html, encoding)
+    if root is None:
+        return []
+    links = []
+    for company in root.iter('div'):
+        if 'company with_img g_' not in ' '.join((company.get('class') or '').split()):
+            continue
+        h4 = next(company.iter('h4'), None)
+        if h4 is None:
+            continue
+        link_elem = next(h4.iter('a'), None)
+        if link_elem is not None and link_elem.get('href') is not None:
+            links.append(urljoin(base_url, link_elem.get('href')))
+    return links
+
+
+CATEGORY_PATH = re.compile(r'^/category/([^/]+)/?$')
+LISTING_PAGE_PATH = re.compile(r'^/category/([^/]+)/(\d+)/?$')
+
+
+def extract_category_links(html, base_url, encoding=None):
+    """Slugs of the /category/<slug> pages linked from a page on the site, in page order"""
+    root = parse_html(html, encoding)
+    if root is None:
+        return []
+    host = urlsplit(base_url).netloc
+    categories = {}
+    for link in root.iter('a'):
+        href = link.get('href')
+        if not href:
+            continue
+        url = urlsplit(urljoin(base_url, href))
+        match = CATEGORY_PATH.match(url.path) or LISTING_PAGE_PATH.match(url.path)
+        if match and url.netloc == host:
+            categories.setdefault(match.group(1), None)
+    return list(categories)
+
+
+def extract_last_page(html, category, encoding=None):
+    """Highest page number of `category` linked from one of its listing pages (1 if it has no pagination).
+
+    Links to other categories' pages, e.g. in a sidebar, are ignored.
+    """
+    root = parse_html(html, encoding)
+    if root is None:
+        return 1
+    last = 1
+    for link in root.iter('a'):
+        match = LISTING_PAGE_PATH.match(urlsplit(link.get('href') or '').path)
+        if match and match.group(1) == category:
+            last = max(last, int(match.group(2)))
+    return last
@@ -0,0 +1,137 @@
+import json
+import os
+import re
+import threading
+import time
+
+
+class FakeAPIError(Exception):
+    """Stand-in for gspread.exceptions.APIError; `code` is the HTTP status"""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeWorksheet:
+    """In-memory worksheet implementing the subset of gspread.Worksheet the scripts use"""
+
+    def __init__(self, backend, title, rows=None):
+        self.backend = backend
+        self.title = title
+        self.rows = rows if rows is not None else []
+
+    def _call(self, cells=0):
+        self.backend._request(cells)
+
+    def get_all_values(self):
+        self._call()
+        return [list(row) for row in self.rows]
+
+    def get_all_records(self):
+        self._call()
+        if not self.rows:
+            return []
+        header = self.rows[0]
+        return [dict(zip(header, row + [''] * (len(header) - len(row)))) for row in self.rows[1:]]
+
+    def row_values(self, row):
+        self._call()
+        return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def batch_update(self, data, **kwargs):
+        """Write each {'range': 'B2', 'values': [[...], ...]} block, starting at its top-left cell"""
+        self._call(sum(len(row) for block in data for row in block['values']))
+        for block in data:
+            match = re.match(r'([A-Z]+)(\d+)', block['range'].split('!')[-1])
+            col = 0
+            for letter in match.group(1):
+                col = col * 26 + ord(letter) - ord('A') + 1
+            for offset, values in enumerate(block['values']):
+                row = int(match.group(2)) + offset
+                while len(self.rows) < row:
+                    self.rows.append([])
+                cells = self.rows[row - 1]
+                cells.extend([''] * (col - 1 + len(values) - len(cells)))
+                cells[col - 1:col - 1 + len(values)] = ['' if value is None else value for value in values]
+        self.backend._save()
+
+    def append_row(self, values, **kwargs):
+        self.append_rows([values], **kwargs)
+
+    def append_rows(self, values, **kwargs):
+        self._call(sum(len(row) for row in values))
+        self.rows.extend(['' if value is None else value for value in row] for row in values)
+        self.backend._save()
+
+
+class FakeSpreadsheet:
+    def __init__(self, backend, title):
+        self.backend = backend
+        self.title = title
+        self.worksheets = [FakeWorksheet(backend, 'Sheet1'), FakeWorksheet(backend, 'Sheet2')]
+
+    @property
+    def sheet1(self):
+        return self.worksheets[0]
+
+    def get_worksheet(self, index):
+        while len(self.worksheets) <= index:
+            self.worksheets.append(FakeWorksheet(self.backend, f"Sheet{len(self.worksheets) + 1}"))
+        return self.worksheets[index]
+
+
+class FakeSheetsClient:
+    """Local stand-in for an authorized gspread client.
+
+    Spreadsheets live in memory and, when `path` is given, are persisted to a JSON
+    file after every write. `latency` adds a delay to every API call, and
+    `quota_per_minute` makes calls beyond that rate fail with a 429 FakeAPIError,
+    so the write path can be tested and benchmarked offline. `calls` and `cells`
+    count API requests and written cells.
+    """
+
+    def __init__(self, path=None, latency=0.0, quota_per_minute=None):
+        self.path = path
+        self.latency = latency
+        self.quota_per_minute = quota_per_minute
+        self.calls = 0
+        self.cells = 0
+        self.spreadsheets = {}
+        self._window = []
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for title, sheets in json.load(f).items():
+                    spreadsheet = self.open(title)
+                    spreadsheet.worksheets = [FakeWorksheet(self, f"Sheet{i + 1}", rows)
+                                              for i, rows in enumerate(sheets)]
+
+    def open(self, title):
+        if title not in self.spreadsheets:
+            self.spreadsheets[title] = FakeSpreadsheet(self, title)
+        return self.spreadsheets[title]
+
+    def _request(self, cells):
+        with self._lock:
+            if self.quota_per_minute is not None:
+                now = time.monotonic()
+                self._window = [t for t in self._window if now - t < 60]
+                if len(self._window) >= self.quota_per_minute:
+                    raise FakeAPIError(429, "Quota exceeded for quota metric 'Write requests'")
+                self._window.append(now)
+            self.calls += 1
+            self.cells += cells
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {title: [sheet.rows for sheet in spreadsheet.worksheets]
+                    for title, spreadsheet in self.spreadsheets.items()}
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
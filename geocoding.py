@@ -0,0 +1,107 @@
+import logging
+import re
+import sqlite3
+import time
+
+from geopy.extra.rate_limiter import RateLimiter
+from geopy.geocoders import Nominatim
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_location(location):
+    """Cache key for a location: lower-case, single-spaced, without edge punctuation"""
+    return re.sub(r'\s+', ' ', location).strip(' ,.;').lower()
+
+
+class GeocodeCache:
+    """Persistent geocoding results keyed by normalized location.
+
+    Both hits and "not found" answers are stored; hits expire after `ttl` seconds
+    and negative answers after `negative_ttl`, so places missing from the geocoder
+    are retried eventually without being looked up on every run.
+    """
+
+    def __init__(self, path='geocode_cache.sqlite', ttl=90 * 24 * 3600, negative_ttl=7 * 24 * 3600):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocodes (
+                key TEXT PRIMARY KEY,
+                latitude REAL,
+                longitude REAL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, key):
+        """Return (True, coords or None) for a live cache entry, (False, None) on a miss"""
+        row = self.conn.execute(
+            "SELECT latitude, longitude, updated_at FROM geocodes WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return False, None
+        latitude, longitude, updated_at = row
+        found = latitude is not None
+        if time.time() - updated_at >= (self.ttl if found else self.negative_ttl):
+            return False, None
+        return True, (latitude, longitude) if found else None
+
+    def put(self, key, coords):
+        latitude, longitude = coords if coords else (None, None)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO geocodes (key, latitude, longitude, updated_at) VALUES (?, ?, ?, ?)",
+                (key, latitude, longitude, time.time()),
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+class Geocoder:
+    """Single rate-limited geocoding client in front of a GeocodeCache.
+
+    All lookups share one Nominatim instance (or `backend`, any object with a geopy
+    style geocode(query) method) throttled to one request per `min_delay` seconds,
+    which is what Nominatim's usage policy asks for. Errors are retried `retries`
+    times and never cached.
+    """
+
+    def __init__(self, cache=None, backend=None, user_agent="business_locator", min_delay=1.0, retries=3,
+                 on_not_found=None):
+        self.cache = cache if cache is not None else GeocodeCache()
+        self.backend = backend if backend is not None else Nominatim(user_agent=user_agent)
+        self._geocode = RateLimiter(self.backend.geocode, min_delay_seconds=min_delay,
+                                    max_retries=retries - 1, error_wait_seconds=2.0,
+                                    swallow_exceptions=False)
+        self.on_not_found = on_not_found
+        self.lookups = 0
+
+    def lookup(self, location):
+        """Coordinates for `location`, or None if it can't be geocoded"""
+        key = normalize_location(location)
+        hit, coords = self.cache.get(key)
+        if hit:
+            return coords
+        self.lookups += 1
+        try:
+            location_data = self._geocode(location)
+        except Exception as e:
+            logger.error("Error geocoding location %r: %s", location, e)
+            return None
+        coords = (location_data.latitude, location_data.longitude) if location_data else None
+        self.cache.put(key, coords)
+        if coords is None and self.on_not_found:
+            self.on_not_found(location)
+        return coords
+
+    def lookup_many(self, locations):
+        """Geocode each distinct location once; returns {location: coords or None}"""
+        by_key = {}
+        for location in locations:
+            by_key.setdefault(normalize_location(location), location)
+        coords_by_key = {key: self.lookup(location) for key, location in by_key.items()}
+        return {location: coords_by_key[normalize_location(location)] for location in locations}
@@ -1,29 +1,174 @@
 import aiofiles
+import argparse
 import httpx
+import importlib.util
 import json
+import os
+import random
+import sqlite3
+import tempfile
 from selectolax.parser import HTMLParser
 from pydantic import BaseModel
+from typing import Optional
 import asyncio
+import time
+
+import metrics
+from pipeline import Stage, run_pipeline
+from search_store import SearchStore
+from sinks import JSONLSink
+from throttle import AdaptiveThrottle, THROTTLE_STATUSES
+
+SEARCH_URL = "https://www.google.com/search"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36"
+}
+# HTTP/2 needs the optional h2 package; without it the client speaks HTTP/1.1 with keep-alive
+HTTP2 = importlib.util.find_spec('h2') is not None
+
+FETCH_SECONDS = metrics.histogram('fetch_seconds', site='google')
+FETCH_BYTES = metrics.counter('fetch_bytes_total', site='google')
+FETCH_RETRIES = metrics.counter('fetch_retries_total', site='google')
+FETCH_ERRORS = metrics.counter('fetch_errors_total', site='google')
+STORE_HITS = metrics.counter('search_store_hits_total')
+PARSE_SECONDS = metrics.histogram('parse_seconds', parser='parse_result')
+
+# Google rate-limits aggressively, so start slow and let the controller find the ceiling
+throttle = AdaptiveThrottle(rate=0.5, concurrency=1, max_rate=2.0, max_concurrency=4, backoff=5.0)
 
 class GoogleResult(BaseModel):
     domain_url: str
     snippets: list
+    error: Optional[str] = None
 
-async def scrape_domains(input_file):
+def make_client(concurrency=20, timeout=10.0):
+    """One pooled client for every search, so connections are set up once and reused"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency, keepalive_expiry=30)
+    return httpx.AsyncClient(headers=HEADERS, http2=HTTP2, limits=limits,
+                             timeout=httpx.Timeout(timeout, connect=5.0), follow_redirects=True)
+
+RESULT_COLUMNS = ('domain_url', 'snippets', 'error')
+
+class DomainSet:
+    """Set of domains that keeps at most `max_in_memory` entries in memory.
+
+    Beyond that the members spill to a temporary SQLite file, so deduplicating a
+    huge input costs bounded memory. `add` returns True if the domain was new.
+    """
+
+    def __init__(self, max_in_memory=100_000):
+        self.max_in_memory = max_in_memory
+        self.members = set()
+        self.conn = None
+        self.path = None
+
+    def add(self, domain):
+        if domain in self.members:
+            return False
+        if self.conn is None and len(self.members) < self.max_in_memory:
+            self.members.add(domain)
+            return True
+        if self.conn is None:
+            fd, self.path = tempfile.mkstemp(suffix='.sqlite', prefix='domains-')
+            os.close(fd)
+            self.conn = sqlite3.connect(self.path)
+            self.conn.execute("CREATE TABLE domains (domain TEXT PRIMARY KEY)")
+        with self.conn:
+            return self.conn.execute("INSERT OR IGNORE INTO domains VALUES (?)", (domain,)).rowcount == 1
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            os.remove(self.path)
+            self.conn = None
+
+def email_domain(line):
+    """Lower-cased domain of an email address line, or None if there is no address"""
+    if '@' not in line:
+        return None
+    return line[line.find('@') + 1:].strip().lower() or None
+
+async def iter_domains(input_file, seen=None):
+    """Yield each new domain in `input_file` as it is read, skipping any already in `seen`"""
+    seen = seen if seen is not None else DomainSet()
     async with aiofiles.open(input_file, 'r', encoding="utf-8") as f:
-        lines = await f.readlines()
-        domain = [line[line.find('@') + 1:].strip() for line in lines if '@' in line]
-    return domain
-
-async def get_html(domain_url):
-    query = f"CEO of {domain_url}"
-    url = f"https://www.google.com/search?q={query}"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36"
-    }
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=headers)
-    return HTMLParser(response.text)
+        async for line in f:
+            domain = email_domain(line)
+            if domain and seen.add(domain):
+                yield domain
+
+async def scrape_domains(input_file):
+    return [domain async for domain in iter_domains(input_file)]
+
+def completed_domains(output_file, seen):
+    """Add the domains already answered in a JSONL results file to `seen`; returns how many.
+
+    Failed lookups are not counted, so they are retried. A last line cut short by a
+    killed run is truncated away so new results start on a fresh line.
+    """
+    if not os.path.exists(output_file):
+        return 0
+    done = 0
+    with open(output_file, 'rb+') as f:
+        end = 0
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            end += len(line)
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if not result.get('error') and seen.add(result['domain_url']):
+                done += 1
+        f.truncate(end)
+    return done
+
+def search_query(domain_url):
+    return f"CEO of {domain_url}"
+
+async def get_html(domain_url, retries=3, client=None, throttle=throttle, backoff=1.0):
+    """Fetch and parse the "CEO of <domain>" results page"""
+    return HTMLParser(await fetch_search_page(domain_url, retries, client, throttle, backoff))
+
+async def fetch_search_page(domain_url, retries=3, client=None, throttle=throttle, backoff=1.0):
+    """Fetch the "CEO of <domain>" results page and return its text.
+
+    Throttled responses are retried once `throttle` lets the host through again and
+    connection errors and timeouts after a jittered exponential backoff. The last
+    failure is raised. Without `client` a one-off client is opened for the call.
+    """
+    if client is None:
+        async with make_client(1) as client:
+            return await fetch_search_page(domain_url, retries, client, throttle, backoff)
+    params = {"q": search_query(domain_url)}
+    for attempt in range(retries):
+        if attempt:
+            FETCH_RETRIES.inc()
+        response = None
+        async with throttle.slot(SEARCH_URL):
+            start = time.monotonic()
+            try:
+                response = await client.get(SEARCH_URL, params=params)
+            except httpx.TransportError:
+                FETCH_ERRORS.inc()
+                throttle.observe(SEARCH_URL, error=True)
+                if attempt == retries - 1:
+                    raise
+        if response is None:
+            await asyncio.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+            continue
+        elapsed = time.monotonic() - start
+        FETCH_SECONDS.observe(elapsed)
+        throttle.observe(SEARCH_URL, elapsed, status=response.status_code,
+                         retry_after=response.headers.get('Retry-After'))
+        if response.status_code not in THROTTLE_STATUSES or attempt == retries - 1:
+            break
+    if response.is_error:
+        FETCH_ERRORS.inc()
+    response.raise_for_status()
+    FETCH_BYTES.inc(len(response.content))
+    return response.text
 
 def parse_result(html):
     page_result = html.css("div.MjjYud")
@@ -37,21 +182,122 @@ def parse_result(html):
         
     return snippets
 
-async def main(input_file):
-    domains = await scrape_domains(input_file)
+async def lookup_domains(domains, on_result, concurrency=20, rate=0.5, adaptive=True, retries=3, timeout=10.0,
+                         store=None):
+    """Search every domain over one shared client, at most `concurrency` at a time.
+
+    `domains` may be any iterable or async iterable; it is consumed lazily, so the
+    input can be far larger than memory. Each domain produces one GoogleResult passed
+    to the coroutine function `on_result` as soon as it is parsed; a domain that
+    fails after its retries gets a result with `error` set instead of stopping the
+    run. With a SearchStore as `store`, fresh stored results are reused instead of
+    searching, and new ones are saved to it. Returns the number of results delivered.
+    """
+    # One host serves every query, so the per-host controller sets the pace. Adaptive
+    # runs start at one search in flight and may widen up to `concurrency`; fixed-rate
+    # runs use all of it from the start
+    search_throttle = AdaptiveThrottle(rate=rate, concurrency=1 if adaptive else concurrency,
+                                       max_rate=max(2.0, 4 * rate),
+                                       max_concurrency=concurrency, global_concurrency=concurrency,
+                                       backoff=5.0, adaptive=adaptive)
+    async with make_client(concurrency, timeout) as client:
+
+        async def lookup(domain):
+            query = search_query(domain)
+            snippets = store.get(query) if store else None
+            if snippets is not None:
+                STORE_HITS.inc()
+                return [GoogleResult(domain_url=domain, snippets=snippets)]
+            try:
+                page = await fetch_search_page(domain, retries, client, search_throttle)
+                with PARSE_SECONDS.time():
+                    snippets = parse_result(HTMLParser(page))
+                if store:
+                    store.put(query, domain, snippets, page)
+                return [GoogleResult(domain_url=domain, snippets=snippets)]
+            except Exception as e:
+                return [GoogleResult(domain_url=domain, snippets=[], error=f"{type(e).__name__}: {e}")]
+
+        stages = [Stage('lookup', lookup, workers=concurrency)]
+        return await run_pipeline(domains, stages, on_result, maxsize=2 * concurrency)
+
+def reparse_store(store):
+    """Re-run parse_result over every raw page kept in `store`; returns how many results changed"""
+    updates = []
+    checked = 0
+    for query, domain_url, old_snippets, html in store.pages():
+        checked += 1
+        snippets = parse_result(HTMLParser(html))
+        if snippets != old_snippets:
+            updates.append((query, snippets))
+    store.update_snippets(updates)
+    print(f"Re-parsed {checked} stored pages, {len(updates)} results changed")
+    return len(updates)
+
+async def main(input_file, output_file='google_results.jsonl', concurrency=20, rate=0.5, adaptive=True, store=None):
+    """Stream domains from `input_file` and append one JSON line per result to `output_file`.
+
+    Every line is flushed as soon as it is written, so a killed run keeps what it
+    finished and the next run skips those domains.
+    """
+    seen = DomainSet()
+    skipped = completed_domains(output_file, seen)
+    if skipped:
+        print(f"Skipping {skipped} domains already in {output_file}")
+    counts = {'snippets': 0, 'empty': 0, 'failed': 0}
+
+    with JSONLSink(output_file, columns=RESULT_COLUMNS, batch_size=1) as results:
 
-    all_results = []
-    for domain in domains:
-        search_result = await get_html(domain)
-        results = parse_result(search_result)
-        if results:  # Only add to results if there are valid snippets
-            google_result = GoogleResult(domain_url=domain, snippets=results)
-            all_results.append(google_result)
+        async def save(result):
+            results.write(result.dict())
+            if result.error:
+                counts['failed'] += 1
+                print(f"Lookup failed for {result.domain_url}: {result.error}")
+            else:
+                counts['snippets' if result.snippets else 'empty'] += 1
 
-    with open('google_results.json', 'a', encoding='utf-8') as f:
-        json.dump([r.dict() for r in all_results], f, ensure_ascii=False, indent=4)
+        try:
+            await lookup_domains(iter_domains(input_file, seen), save, concurrency=concurrency, rate=rate,
+                                 adaptive=adaptive, store=store)
+        finally:
+            seen.close()
+    print(f"Looked up {sum(counts.values())} domains: {counts['snippets']} with snippets, "
+          f"{counts['empty']} without, {counts['failed']} failed")
 
 if __name__ == "__main__":
-    input_file = 'input.txt'  # Specify your input file here
-    asyncio.run(main(input_file))
+    parser = argparse.ArgumentParser(description="Look up the CEO of each email domain on Google")
+    parser.add_argument('input_file', nargs='?', default='input.txt', help="File of email addresses, one per line")
+    parser.add_argument('--output', default='google_results.jsonl',
+                        help="JSON Lines results file; domains already in it are skipped")
+    parser.add_argument('--concurrency', type=int, default=20, help="Max searches in flight")
+    parser.add_argument('--rate', type=float, default=0.5, help="Starting searches per second")
+    parser.add_argument('--fixed-rate', action='store_true', help="Keep --rate fixed instead of adapting it")
+    parser.add_argument('--store', default='search_results.sqlite', help="Stored search results file")
+    parser.add_argument('--store-ttl', type=float, default=30 * 24 * 3600,
+                        help="Seconds before a stored result is searched for again")
+    parser.add_argument('--no-store', action='store_true', help="Always search, never reuse stored results")
+    parser.add_argument('--keep-html', action='store_true',
+                        help="Keep raw result pages in the store so they can be re-parsed later")
+    parser.add_argument('--reparse', action='store_true',
+                        help="Re-parse the raw pages kept in the store with the current selectors and exit")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="Write fetch, parse and pipeline metrics to PATH at the end of the run "
+                             "(and on SIGUSR1; stderr when not given)")
+    parser.add_argument('--metrics-format', choices=['json', 'prometheus'], default='json',
+                        help="Format for --metrics and SIGUSR1 dumps")
+    args = parser.parse_args()
+    metrics.dump_on_signal(args.metrics, args.metrics_format)
 
+    store = None if args.no_store else SearchStore(args.store, ttl=args.store_ttl, keep_html=args.keep_html)
+    try:
+        if args.reparse:
+            if store is None:
+                parser.error("--reparse needs the store")
+            reparse_store(store)
+        else:
+            asyncio.run(main(args.input_file, args.output, args.concurrency, args.rate, not args.fixed_rate, store))
+    finally:
+        if store is not None:
+            store.close()
+        if args.metrics:
+            metrics.REGISTRY.dump(args.metrics, args.metrics_format)
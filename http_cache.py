@@ -0,0 +1,121 @@
+import codecs
+import sqlite3
+import time
+import zlib
+
+
+class CachedResponse:
+    __slots__ = ('url', 'content', 'etag', 'last_modified', 'fetched_at')
+
+    def __init__(self, url, content, etag, last_modified, fetched_at):
+        self.url = url
+        self.content = content          # UTF-8 encoded body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+
+class ResponseCache:
+    """Persistent, size-bounded HTTP response cache keyed by URL.
+
+    Bodies are stored UTF-8 encoded and zlib-compressed in a single SQLite file. Entries younger than `ttl`
+    seconds are served without touching the network; older ones are revalidated with
+    If-None-Match / If-Modified-Since so an unchanged page only costs a 304. When the
+    compressed bodies exceed `max_bytes` the least recently used entries are evicted.
+    """
+
+    def __init__(self, path='http_cache.sqlite', ttl=24 * 3600, max_bytes=512 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at)")
+        self.conn.commit()
+        self._total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, url):
+        """Return the cached response for `url`, fresh or not, or None"""
+        row = self.conn.execute(
+            "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        self.conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        self.conn.commit()
+        body, etag, last_modified, fetched_at = row
+        return CachedResponse(url, zlib.decompress(body), etag, last_modified, fetched_at)
+
+    def is_fresh(self, entry):
+        return time.time() - entry.fetched_at < self.ttl
+
+    def conditional_headers(self, entry):
+        """Revalidation headers for a stale entry"""
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def store(self, url, content, etag=None, last_modified=None, encoding='utf-8'):
+        """Cache a response body given as bytes in `encoding` (or as str)"""
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        elif codecs.lookup(encoding).name != 'utf-8':
+            content = content.decode(encoding, errors='replace').encode('utf-8')
+        body = zlib.compress(content, 6)
+        now = time.time()
+        old = self.conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (url, body, size, etag, last_modified, fetched_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, body, len(body), etag, last_modified, now, now),
+        )
+        self._total += len(body) - (old[0] if old else 0)
+        if self._total > self.max_bytes:
+            self._evict()
+        self.conn.commit()
+
+    def touch(self, url):
+        """Mark an entry as revalidated (the server answered 304)"""
+        now = time.time()
+        self.conn.execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+        self.conn.commit()
+
+    def _evict(self):
+        # Drop least recently used entries until we are back under 90% of the budget
+        target = self.max_bytes * 0.9
+        rows = self.conn.execute("SELECT url, size FROM responses ORDER BY accessed_at")
+        doomed = []
+        for url, size in rows:
+            if self._total <= target:
+                break
+            doomed.append((url,))
+            self._total -= size
+        self.conn.executemany("DELETE FROM responses WHERE url = ?", doomed)
+
+    def items(self):
+        """Yield (url, text) for every cached page, e.g. to re-run parsers offline"""
+        for url, body in self.conn.execute("SELECT url, body FROM responses ORDER BY url"):
+            yield url, zlib.decompress(body).decode('utf-8')
+
+    def close(self):
+        self.conn.close()
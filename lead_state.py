@@ -0,0 +1,58 @@
+import re
+import sqlite3
+import time
+
+from crawl_state import CrawlState
+
+
+def lead_key(company_name, phone_number):
+    """Identity of a lead: case- and whitespace-insensitive name plus phone digits"""
+    name = re.sub(r'\s+', ' ', str(company_name or '')).strip().lower()
+    phone = re.sub(r'\D', '', str(phone_number or ''))
+    return f"{name}|{phone}"
+
+
+class LeadIndex:
+    """Row-hash index of the source rows qualify_leads has already processed.
+
+    Each source row is keyed by lead_key and stored with a hash of its contents,
+    so a rerun only geocodes and qualifies rows that are new or have changed since
+    the last successful run.
+    """
+
+    def __init__(self, path='lead_state.sqlite'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS source_rows (
+                key TEXT PRIMARY KEY,
+                row_hash TEXT NOT NULL,
+                qualified INTEGER NOT NULL,
+                processed_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    record_hash = staticmethod(CrawlState.record_hash)
+
+    def changed(self, keyed_records):
+        """The (key, record) pairs whose record is new or differs from the last run"""
+        known = dict(self.conn.execute("SELECT key, row_hash FROM source_rows"))
+        return [(key, record) for key, record in keyed_records
+                if known.get(key) != self.record_hash(record)]
+
+    def commit(self, processed):
+        """Record processed rows in one transaction; `processed` holds (key, record, qualified)"""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO source_rows (key, row_hash, qualified, processed_at) VALUES (?, ?, ?, ?)",
+                [(key, self.record_hash(record), int(qualified), now) for key, record, qualified in processed],
+            )
+
+    def reset(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM source_rows")
+
+    def close(self):
+        self.conn.close()
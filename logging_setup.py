@@ -0,0 +1,39 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener = None
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # The queue never leaves the process, so hand over the record as is and let the
+        # listener thread do the %-formatting instead of the logging call site
+        return record
+
+
+def setup_logging(filename='scraper.log', level=logging.INFO):
+    """Send log records through a queue to a file handler running on a background thread.
+
+    Logging calls on the hot path only enqueue the record; formatting and the file
+    write happen on the listener thread. Safe to call more than once: later calls
+    only change the level. The listener is flushed and stopped at exit.
+    """
+    global _listener
+    root = logging.getLogger()
+    root.setLevel(level)
+    # httpx logs every request at INFO; keep that out of the log unless debugging
+    logging.getLogger('httpx').setLevel(level if level <= logging.DEBUG else logging.WARNING)
+    if _listener is not None:
+        return _listener
+    records = queue.SimpleQueue()
+    file_handler = logging.FileHandler(filename, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root.addHandler(_QueueHandler(records))
+    _listener = logging.handlers.QueueListener(records, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
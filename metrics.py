@@ -0,0 +1,175 @@
+import bisect
+import json
+import logging
+import signal
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, from fast parses up to slow, retried fetches
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Counter:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Fixed-bucket histogram; observing is a bisect and a few additions"""
+
+    __slots__ = ('bounds', 'counts', 'count', 'sum', '_lock')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)   # the last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe the duration of the block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def quantile(self, q):
+        """Estimate of the q-quantile: the upper bound of the bucket it falls in"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class Registry:
+    """Named counters and histograms, optionally labelled, with JSON and Prometheus dumps.
+
+    Metrics are created on first use; `counter(name, **labels)` and
+    `histogram(name, **labels)` return the same object for the same name and labels,
+    so hot paths can look them up once and keep the reference.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.help = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def _get(self, factory, name, labels):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self.metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self.metrics.setdefault(key, factory())
+        return metric
+
+    def counter(self, name, **labels):
+        return self._get(Counter, name, labels)
+
+    def histogram(self, name, buckets=DEFAULT_BUCKETS, **labels):
+        return self._get(lambda: Histogram(buckets), name, labels)
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def timer(self, name, **labels):
+        """Context manager observing the duration of the block in the `name` histogram"""
+        return self.histogram(name, **labels).time()
+
+    def to_dict(self):
+        result = {'uptime_seconds': round(time.time() - self.started, 3), 'counters': [], 'histograms': []}
+        for (name, labels), metric in sorted(self.metrics.items(), key=lambda item: item[0]):
+            entry = {'name': name, 'labels': dict(labels)}
+            if isinstance(metric, Counter):
+                entry['value'] = metric.value
+                result['counters'].append(entry)
+            else:
+                entry.update(count=metric.count, sum=round(metric.sum, 6),
+                             p50=metric.quantile(0.5), p99=metric.quantile(0.99),
+                             buckets=dict(zip([str(bound) for bound in metric.bounds] + ['+Inf'], metric.counts)))
+                result['histograms'].append(entry)
+        return result
+
+    def to_prometheus(self):
+        lines = []
+        described = set()
+        for (name, labels), metric in sorted(self.metrics.items(), key=lambda item: item[0]):
+            if name not in described:
+                described.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {'counter' if isinstance(metric, Counter) else 'histogram'}")
+            if isinstance(metric, Counter):
+                lines.append(f"{name}{_labels(labels)} {metric.value}")
+                continue
+            cumulative = 0
+            for bound, count in zip([str(bound) for bound in metric.bounds] + ['+Inf'], metric.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {metric.sum}")
+            lines.append(f"{name}_count{_labels(labels)} {metric.count}")
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path=None, fmt='json'):
+        """Write all metrics to `path` (stderr when None) as JSON or Prometheus text"""
+        text = self.to_prometheus() if fmt == 'prometheus' else json.dumps(self.to_dict(), indent=2) + '\n'
+        if path is None:
+            sys.stderr.write(text)
+            return
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+timer = REGISTRY.timer
+describe = REGISTRY.describe
+
+
+def dump_on_signal(path=None, fmt='json', signum=None):
+    """Dump REGISTRY whenever the process receives `signum` (SIGUSR1 by default).
+
+    Does nothing where the signal doesn't exist, e.g. SIGUSR1 on Windows.
+    """
+    signum = signum if signum is not None else getattr(signal, 'SIGUSR1', None)
+    if signum is None:
+        return False
+
+    def handler(received, frame):
+        logger.info("Dumping metrics on signal %s", received)
+        REGISTRY.dump(path, fmt)
+
+    signal.signal(signum, handler)
+    return True
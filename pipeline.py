@@ -0,0 +1,98 @@
+import asyncio
+import logging
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# End-of-stream marker passed down the queues on shutdown
+_DONE = object()
+
+
+class Stage:
+    """One pipeline stage: `workers` tasks each turning an input item into zero or more outputs.
+
+    `handler` is a coroutine function that takes one item and returns an iterable of
+    items for the next stage, or None to drop the item.
+    """
+
+    def __init__(self, name, handler, workers=1):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+
+
+async def run_pipeline(source, stages, sink, maxsize=100):
+    """Stream items from `source` through `stages` into the coroutine function `sink`.
+
+    Consecutive stages are connected by queues holding at most `maxsize` items, so a
+    slow stage blocks the ones feeding it instead of letting work pile up in memory.
+    When the source is exhausted every stage drains and shuts down in order; if any
+    task fails, the whole pipeline is cancelled and the error re-raised. Returns the
+    number of items delivered to the sink.
+    """
+    queues = [asyncio.Queue(maxsize) for _ in range(len(stages) + 1)]
+    delivered = 0
+
+    async def produce():
+        if hasattr(source, '__aiter__'):
+            async for item in source:
+                await queues[0].put(item)
+        else:
+            for item in source:
+                await queues[0].put(item)
+        for _ in range(stages[0].workers):
+            await queues[0].put(_DONE)
+
+    async def work(stage, inbox, outbox, running, next_workers):
+        received = metrics.counter('pipeline_items_total', stage=stage.name, event='in')
+        emitted = metrics.counter('pipeline_items_total', stage=stage.name, event='out')
+        failed = metrics.counter('pipeline_items_total', stage=stage.name, event='error')
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                break
+            received.inc()
+            try:
+                outputs = await stage.handler(item)
+            except Exception:
+                failed.inc()
+                logger.exception("Stage %s dropped an item after an error", stage.name)
+                continue
+            for output in outputs or ():
+                emitted.inc()
+                await outbox.put(output)
+        # The last worker of a stage to finish tells every worker of the next stage
+        running[0] -= 1
+        if running[0] == 0:
+            for _ in range(next_workers):
+                await outbox.put(_DONE)
+
+    async def consume():
+        nonlocal delivered
+        sunk = metrics.counter('pipeline_items_total', stage='sink', event='in')
+        while True:
+            item = await queues[-1].get()
+            if item is _DONE:
+                return
+            await sink(item)
+            sunk.inc()
+            delivered += 1
+
+    tasks = [asyncio.create_task(produce())]
+    for index, stage in enumerate(stages):
+        next_workers = stages[index + 1].workers if index + 1 < len(stages) else 1
+        running = [stage.workers]
+        tasks.extend(
+            asyncio.create_task(work(stage, queues[index], queues[index + 1], running, next_workers))
+            for _ in range(stage.workers)
+        )
+    tasks.append(asyncio.create_task(consume()))
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return delivered
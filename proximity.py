@@ -0,0 +1,122 @@
+import csv
+import json
+import math
+
+import numpy as np
+from geopy.distance import geodesic
+
+EARTH_RADIUS_MILES = 3958.8
+# A degree of latitude is never shorter than this, which keeps grid cells conservative
+MIN_MILES_PER_DEGREE = 68.7
+
+
+def load_pois(path):
+    """Load points of interest as {name: (latitude, longitude)}.
+
+    Accepts a JSON object mapping names to [lat, lon], or a CSV file with name,
+    latitude and longitude columns.
+    """
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            return {name: (float(lat), float(lon)) for name, (lat, lon) in json.load(f).items()}
+    with open(path, newline='', encoding='utf-8') as f:
+        return {row['name']: (float(row['latitude']), float(row['longitude'])) for row in csv.DictReader(f)}
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """Great-circle distance in miles; arguments are degrees and broadcast like NumPy arrays"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class ProximityResult:
+    __slots__ = ('within', 'nearest', 'distance')
+
+    def __init__(self, within, nearest, distance):
+        self.within = within        # bool array: nearest POI is within the radius
+        self.nearest = nearest      # name of the nearest POI for each point
+        self.distance = distance    # miles to that POI
+
+
+class ProximityIndex:
+    """Grid index of points of interest for batch radius and nearest-POI queries.
+
+    POIs are bucketed into cells at least `radius_miles` wide, so every POI within
+    the radius of a point lies in the point's 3x3 cell neighbourhood. Distances are
+    computed with vectorized haversine per occupied cell; points with no POI inside
+    the radius fall back to a full scan so the reported nearest POI is always exact.
+    With `exact_boundary`, points whose haversine distance is within
+    `boundary_tolerance` (a fraction of the radius) of the radius are re-checked
+    with geopy's ellipsoidal geodesic, matching is_within_distance on the edge cases.
+    """
+
+    def __init__(self, pois, radius_miles=5.0, exact_boundary=True, boundary_tolerance=0.01):
+        self.names = np.array(list(pois.keys()), dtype=object)
+        self.coords = np.array(list(pois.values()), dtype=float).reshape(-1, 2)
+        self.radius = radius_miles
+        self.exact_boundary = exact_boundary
+        self.band = radius_miles * boundary_tolerance
+        self.lat_step = radius_miles / MIN_MILES_PER_DEGREE
+        # Longitude degrees shrink towards the poles; size cells for the highest covered latitude
+        self.max_lat = min(89.0, float(np.abs(self.coords[:, 0]).max()) + self.lat_step) if len(self.coords) else 0.0
+        self.lon_step = self.lat_step / math.cos(math.radians(self.max_lat))
+        self.cells = {}
+        for i, cell in enumerate(map(tuple, self._cells(self.coords))):
+            self.cells.setdefault(cell, []).append(i)
+
+    def _cells(self, coords):
+        return np.floor(np.column_stack((coords[:, 0] / self.lat_step, coords[:, 1] / self.lon_step))).astype(int)
+
+    def query(self, points):
+        """Nearest POI, its distance and whether it is within the radius, for each (lat, lon)"""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        nearest = np.full(len(points), -1)
+        distance = np.full(len(points), np.inf)
+        if len(points) and len(self.coords):
+            self._query_grid(points, nearest, distance)
+            # Nothing within the radius nearby (or beyond the latitude band the grid was sized for)
+            rest = np.flatnonzero((distance > self.radius) | (np.abs(points[:, 0]) > self.max_lat))
+            if len(rest):
+                self._query_all(points, rest, nearest, distance)
+            if self.exact_boundary:
+                self._refine_boundary(points, nearest, distance)
+        names = [self.names[i] if i >= 0 else None for i in nearest]
+        return ProximityResult(distance <= self.radius, names, distance)
+
+    def _query_grid(self, points, nearest, distance):
+        groups = {}
+        for i, cell in enumerate(map(tuple, self._cells(points))):
+            groups.setdefault(cell, []).append(i)
+        for (row, col), members in groups.items():
+            candidates = [poi for d_row in (-1, 0, 1) for d_col in (-1, 0, 1)
+                          for poi in self.cells.get((row + d_row, col + d_col), ())]
+            if candidates:
+                self._assign(points, np.array(members), np.array(candidates), nearest, distance)
+
+    def _query_all(self, points, rows, nearest, distance, chunk=2048):
+        everything = np.arange(len(self.coords))
+        for start in range(0, len(rows), chunk):
+            self._assign(points, rows[start:start + chunk], everything, nearest, distance)
+
+    def _assign(self, points, rows, candidates, nearest, distance):
+        # (rows x candidates) distance matrix in one vectorized call
+        d = haversine_miles(points[rows, 0][:, None], points[rows, 1][:, None],
+                            self.coords[candidates, 0][None, :], self.coords[candidates, 1][None, :])
+        best = d.argmin(axis=1)
+        best_d = d[np.arange(len(rows)), best]
+        better = best_d < distance[rows]
+        nearest[rows[better]] = candidates[best[better]]
+        distance[rows[better]] = best_d[better]
+
+    def _refine_boundary(self, points, nearest, distance):
+        for row in np.flatnonzero(np.abs(distance - self.radius) <= self.band):
+            d = haversine_miles(points[row, 0], points[row, 1], self.coords[:, 0], self.coords[:, 1])
+            best_i, best_d = nearest[row], math.inf
+            for i in np.flatnonzero(d <= self.radius + 2 * self.band):
+                exact = geodesic(tuple(points[row]), tuple(self.coords[i])).miles
+                if exact < best_d:
+                    best_i, best_d = i, exact
+            if best_d < math.inf:
+                nearest[row], distance[row] = best_i, best_d
@@ -1,26 +1,28 @@
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import argparse
+
 from geopy.distance import geodesic
-from geopy.geocoders import Nominatim
-
-def get_coordinates(location, retries=3):
-    """Convert a location string to latitude and longitude with retry logic."""
-    geolocator = Nominatim(user_agent="business_locator")
-    for attempt in range(retries):
-        try:
-            location_data = geolocator.geocode(location)
-            if location_data:
-                return (location_data.latitude, location_data.longitude)
-            else:
-                print(f"Location not found for: {location}")
-                log_failed_geocoding(location)  # Log the failed attempt
-                return None  # Location not found
-        except Exception as e:
-            print(f"Error geocoding location '{location}': {str(e)}")
-            if attempt < retries - 1:
-                print("Retrying...")
-            else:
-                return None
+
+from fake_sheets import FakeSheetsClient
+from geocoding import Geocoder
+from lead_state import LeadIndex, lead_key
+from proximity import ProximityIndex, load_pois
+from sinks import SPREADSHEET, GoogleSheetSink, authorize
+
+_geocoder = None
+
+def get_geocoder():
+    """Shared rate-limited geocoder with a persistent cache of hits and misses."""
+    global _geocoder
+    if _geocoder is None:
+        _geocoder = Geocoder(on_not_found=log_failed_geocoding)
+    return _geocoder
+
+def get_coordinates(location):
+    """Convert a location string to latitude and longitude, using the geocode cache when possible."""
+    coords = get_geocoder().lookup(location)
+    if coords is None:
+        print(f"Location not found for: {location}")
+    return coords
 
 def preprocess_address(address):
     """Extract the town from the address to improve geocoding results."""
@@ -51,81 +53,115 @@ def is_within_distance(business_location, universities, max_distance=5):
             return True
     return False
 
-def qualify_leads():
-    # Define the scope and authenticate
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name(r'C:\Users\ayo\Webscraping\elegant-moment-413814-6e8f42efa6fc.json', scope)
-    client = gspread.authorize(creds)
-
-    # Open the existing Google Sheet
-    existing_sheet = client.open("ShopMammy Tracker").sheet1
-    existing_data = existing_sheet.get_all_records()
-
-    print("Existing data retrieved from Google Sheet:")
-    print(existing_data)
+QUALIFIED_HEADER = ['Company Name', 'Location', 'State', 'Phone Number', 'Website URL', 'Company Size', 'Primary Contact Name', 'Contact Position', 'Contact Source', 'Proximity Qualification', 'Nearest POI', 'Distance (miles)']
 
-    # Open the existing Google Sheet and access sheet 2 for qualified leads
-    qualified_sheet = client.open("ShopMammy Tracker").get_worksheet(1)  # Accessing the second sheet (index 1)
-    qualified_header = ['Company Name', 'Location', 'State', 'Phone Number', 'Website URL', 'Company Size', 'Primary Contact Name', 'Contact Position', 'Contact Source', 'Proximity Qualification']
-    qualified_sheet.append_row(qualified_header)
+def qualify_leads(geocoder=None, poi_path=None, max_distance=5, poi_label='a university', client=None,
+                  state_path='lead_state.sqlite', incremental=True):
+    """Qualify new or changed tracker rows and upsert them into the qualified sheet in one batch."""
+    geocoder = geocoder or get_geocoder()
+    # POIs come from a JSON/CSV file when given, otherwise the built-in universities
+    index = ProximityIndex(load_pois(poi_path) if poi_path else universities, radius_miles=max_distance)
+    client = client or authorize()
+    lead_index = LeadIndex(state_path)
+    if not incremental:
+        lead_index.reset()
 
-    # Process each business and qualify leads
-    for business in existing_data:
-        # Extract relevant data
-        company_name = business.get('Company Name')
+    # Open the existing Google Sheet
+    existing_data = client.open(SPREADSHEET).sheet1.get_all_records()
+
+    # Only rows that are new or changed since the last run need any work
+    keyed = [(lead_key(business.get('Company Name'), business.get('Contact Phone Number')), business)
+             for business in existing_data]
+    pending = lead_index.changed(keyed)
+    print(f"{len(pending)} of {len(existing_data)} tracker rows are new or changed")
+
+    # Sheet 2 holds the qualified leads; the sink writes the header, or extends an older one
+    qualified_sheet = GoogleSheetSink(SPREADSHEET, worksheet_index=1, client=client, columns=QUALIFIED_HEADER,
+                                      batch_size=len(pending) + 1, max_delay=None)
+    present = {lead_key(row.get('Company Name'), row.get('Phone Number'))
+               for row in qualified_sheet.read_records()} if pending else set()
+
+    # Geocode every distinct town once up front instead of once per business
+    towns = [preprocess_address(business['Location']) for _, business in pending if business.get('Location')]
+    coordinates = geocoder.lookup_many(towns)
+    print(f"Geocoded {len(towns)} businesses with {geocoder.lookups} network lookups")
+
+    # Keep the businesses we have coordinates for, then measure them all in one batch
+    processed = []
+    located = []
+    for key, business in pending:
         location = business.get('Location')
-        state = business.get('State')
-        phone_number = business.get('Contact Phone Number')
-        website_url = business.get('Website')
-        company_size = business.get('Company Size')
-        primary_contact_name = business.get('Contact Person Name')
-        contact_position = business.get('Contact Person Position')
-        contact_source = business.get('Contact Source')
-
         # Validate location
         if not location:
             print("Location is missing for a business. Skipping...")
+            processed.append((key, business, False))
             continue  # Skip this business if location is not found
 
         # Extract the town from the location
         town = preprocess_address(location)
 
         # Get coordinates from the location
-        business_location = get_coordinates(town)
+        business_location = coordinates.get(town)
         if not business_location:
             print(f"Could not get coordinates for location: {town}")
-            continue  # Skip this business if coordinates are not found
+            continue  # Left unrecorded so the next run retries it
+        located.append((key, business, business_location))
 
-        # Print the coordinates for debugging
-        print(f"Coordinates for {location}: {business_location}")
+    proximity = index.query([business_location for _, _, business_location in located])
+
+    # Process each business and qualify leads
+    for i, (key, business, business_location) in enumerate(located):
+        state = business.get('State')
 
         # Check proximity and state criteria
         proximity_qualification = 'Not Qualified'
-        if is_within_distance(business_location, universities):
-            proximity_qualification = 'Within 5 miles of a university'
+        if proximity.within[i]:
+            proximity_qualification = f'Within {max_distance:g} miles of {poi_label}'
 
         # You can also add state qualification logic here
         if state in ['Lagos', 'Oyo']:  # Example states to qualify
             proximity_qualification += ' and in a qualified state'
 
-        # Append to the new sheet if qualified
-        if proximity_qualification != 'Not Qualified':
-            qualified_row = [
-                company_name,
-                location,
-                state,
-                phone_number,
-                website_url,
-                company_size,
-                primary_contact_name,
-                contact_position,
-                contact_source,
-                proximity_qualification
-            ]
-            qualified_sheet.append_row(qualified_row)
-            print(f"Qualified lead added: {qualified_row}")
-
-    print("Qualified leads have been populated in the new sheet.")
+        qualified = proximity_qualification != 'Not Qualified'
+        processed.append((key, business, qualified))
+        # Queue the lead unless an earlier run already wrote it
+        if qualified and key not in present:
+            present.add(key)
+            qualified_sheet.write({
+                'Company Name': business.get('Company Name'),
+                'Location': business.get('Location'),
+                'State': state,
+                'Phone Number': business.get('Contact Phone Number'),
+                'Website URL': business.get('Website'),
+                'Company Size': business.get('Company Size'),
+                'Primary Contact Name': business.get('Contact Person Name'),
+                'Contact Position': business.get('Contact Person Position'),
+                'Contact Source': business.get('Contact Source'),
+                'Proximity Qualification': proximity_qualification,
+                'Nearest POI': proximity.nearest[i],
+                'Distance (miles)': round(float(proximity.distance[i]), 2),
+            })
+
+    # One append for the whole run; rows are marked processed only once it has landed
+    qualified_sheet.close()
+    lead_index.commit(processed)
+    lead_index.close()
+    print(f"Added {qualified_sheet.written} qualified leads to the qualified sheet.")
+    return qualified_sheet.written
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Qualify tracker businesses by proximity to points of interest")
+    parser.add_argument('--pois', metavar='PATH', help="JSON or CSV file of points of interest (default: universities)")
+    parser.add_argument('--radius', type=float, default=5, help="Qualifying distance in miles")
+    parser.add_argument('--label', default='a university', help="How the POIs are described in the qualification")
+    parser.add_argument('--state', default='lead_state.sqlite', help="Index of tracker rows already processed")
+    parser.add_argument('--full', action='store_true', help="Re-qualify every tracker row, not just new or changed ones")
+    parser.add_argument('--fake-sheets', metavar='PATH',
+                        help="Use a local JSON-backed stand-in for Google Sheets instead of the real API")
+    args = parser.parse_args(argv)
+    client = FakeSheetsClient(args.fake_sheets) if args.fake_sheets else None
+    qualify_leads(poi_path=args.pois, max_distance=args.radius, poi_label=args.label, client=client,
+                  state_path=args.state, incremental=not args.full)
 
 if __name__ == "__main__":
-    qualify_leads()
\ No newline at end of file
+    main()
\ No newline at end of file
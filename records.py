@@ -0,0 +1,113 @@
+import importlib.util
+import logging
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from extraction import BUSINESS_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+DUPLICATES = metrics.counter('records_dropped_total', reason='duplicate')
+
+# '1-5', '120', '500+'; anything else is an unknown size
+_EMPLOYEES = r'^(\d+)\s*(?:-\s*(\d+)|(\+))?$'
+_PHONE_SEPARATORS = r'\s*[,;/]\s*'
+
+# Arrow-backed strings run the regex passes below in C rather than row by row in Python
+STRING_DTYPE = 'string[pyarrow]' if importlib.util.find_spec('pyarrow') else 'string'
+
+
+def clean_whitespace(frame):
+    """Collapse runs of whitespace and strip every column; blank values become missing"""
+    for column in frame.columns:
+        cleaned = frame[column].str.replace(r'\s+', ' ', regex=True).str.strip()
+        frame[column] = cleaned.where(cleaned.str.len() > 0)
+    return frame
+
+
+def _national_number(numbers):
+    digits = numbers.str.replace(r'\D', '', regex=True)
+    length = digits.str.len()
+    national = numbers.where(numbers.str.len() > 0)
+    national = national.mask((length == 13) & digits.str.startswith('234'), '0' + digits.str.slice(3))
+    national = national.mask((length == 11) & digits.str.startswith('0'), digits)
+    return national.mask((length == 10) & ~digits.str.startswith('0'), '0' + digits)
+
+
+def normalize_phones(phones):
+    """Nigerian numbers in national form ('08031234567'), several joined with ', '.
+
+    '+234 803 123 4567', '0803-123-4567' and '803 123 4567' all become
+    '08031234567'; parts that don't look like a Nigerian number are kept as they are.
+    """
+    parts = phones.str.split(_PHONE_SEPARATORS, regex=True, expand=True)
+    joined = None
+    # One pass per position rather than per number; most businesses list one or two
+    for position in parts.columns:
+        number = _national_number(parts[position].astype(phones.dtype))
+        if joined is None:
+            joined = number
+        else:
+            joined = (joined + ', ' + number).fillna(joined).fillna(number)
+    return joined
+
+
+def bucket_sizes(employees):
+    """Bucket employee counts such as '1-5', '120' or '501+' into Small/Medium/Large/Unknown.
+
+    Small is at most 50 employees, Medium starts at 51 and Large above 500, as does
+    any open-ended count from '500+' up; a range spanning two buckets, or text that
+    isn't a count, is Unknown. Missing counts stay None.
+    """
+    bounds = employees.str.extract(_EMPLOYEES)
+    lower = pd.to_numeric(bounds[0]).astype(float)
+    open_ended = bounds[2].notna()
+    upper = pd.to_numeric(bounds[1]).astype(float).fillna(lower).where(~open_ended, np.inf)
+    sizes = np.select(
+        [upper <= 50, (lower >= 51) & (upper <= 500), (lower > 500) | (open_ended & (lower >= 500))],
+        ['Small', 'Medium', 'Large'],
+        default='Unknown',
+    )
+    return pd.Series(sizes, index=employees.index, dtype=employees.dtype).where(employees.notna())
+
+
+def lead_keys(frame):
+    """Vectorized lead_state.lead_key: case- and whitespace-insensitive name plus phone digits"""
+    names = frame['Company Name'].fillna('').str.replace(r'\s+', ' ', regex=True).str.strip().str.lower()
+    phones = frame['Phone Number'].fillna('').str.replace(r'\D', '', regex=True)
+    return names + '|' + phones
+
+
+class BusinessCleaner:
+    """Batch post-processing of business rows before a sink writes them.
+
+    Each batch becomes a DataFrame and goes through whitespace cleanup, phone
+    normalization and size bucketing as column operations. Businesses with the same
+    name and phone as one earlier in the batch, or in an earlier batch this cleaner
+    has been told about with remember(), are dropped.
+    """
+
+    def __init__(self, columns=BUSINESS_COLUMNS):
+        self.columns = tuple(columns)
+        self.seen = set()
+
+    def clean(self, rows):
+        """Return the cleaned rows and their lead keys, to pass to remember() once they are saved"""
+        frame = clean_whitespace(pd.DataFrame(rows, columns=self.columns, dtype=STRING_DTYPE))
+        frame['Phone Number'] = normalize_phones(frame['Phone Number'])
+        frame['Company Size'] = bucket_sizes(frame['Company Size'])
+        keys = lead_keys(frame)
+        # A row with neither a name nor a phone number can't be told apart from others
+        duplicate = keys.duplicated() | keys.map(self.seen.__contains__).astype(bool)
+        duplicate &= keys != '|'
+        if duplicate.any():
+            DUPLICATES.inc(int(duplicate.sum()))
+            logger.info("Dropped %d duplicate businesses", duplicate.sum())
+            frame, keys = frame[~duplicate], keys[~duplicate]
+        # Missing values leave as None rather than pd.NA
+        return frame.astype(object).where(frame.notna(), None).values.tolist(), keys.tolist()
+
+    def remember(self, keys):
+        self.seen.update(keys)
@@ -0,0 +1,71 @@
+import json
+import sqlite3
+import time
+import zlib
+
+
+class SearchStore:
+    """Persistent store of parsed search results keyed by query.
+
+    Snippets for a query younger than `ttl` seconds are served without searching
+    again. With `keep_html` the raw results page is kept too, zlib-compressed, so
+    the snippets can be re-parsed after a selector change without re-querying.
+    """
+
+    def __init__(self, path='search_results.sqlite', ttl=30 * 24 * 3600, keep_html=False):
+        self.path = path
+        self.ttl = ttl
+        self.keep_html = keep_html
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                query TEXT PRIMARY KEY,
+                domain_url TEXT NOT NULL,
+                snippets TEXT NOT NULL,
+                html BLOB,
+                fetched_at REAL NOT NULL,
+                parsed_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, query):
+        """Snippets stored for `query` if still fresh, otherwise None"""
+        row = self.conn.execute(
+            "SELECT snippets, fetched_at FROM results WHERE query = ?", (query,)
+        ).fetchone()
+        if row is None or time.time() - row[1] >= self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, query, domain_url, snippets, html=None):
+        """Store the snippets parsed for `query`, plus its page when keeping HTML"""
+        body = zlib.compress(html.encode('utf-8'), 6) if self.keep_html and html is not None else None
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results (query, domain_url, snippets, html, fetched_at, parsed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (query, domain_url, json.dumps(snippets, ensure_ascii=False), body, now, now),
+            )
+
+    def pages(self):
+        """Yield (query, domain_url, snippets, html) for every stored raw page"""
+        rows = self.conn.execute(
+            "SELECT query, domain_url, snippets, html FROM results WHERE html IS NOT NULL ORDER BY query"
+        )
+        for query, domain_url, snippets, body in rows:
+            yield query, domain_url, json.loads(snippets), zlib.decompress(body).decode('utf-8')
+
+    def update_snippets(self, updates):
+        """Replace the snippets of stored queries; `updates` holds (query, snippets) pairs"""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE results SET snippets = ?, parsed_at = ? WHERE query = ?",
+                [(json.dumps(snippets, ensure_ascii=False), now, query) for query, snippets in updates],
+            )
+
+    def close(self):
+        self.conn.close()
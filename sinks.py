@@ -0,0 +1,253 @@
+import csv
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+
+import gspread
+from oauth2client.service_account import ServiceAccountCredentials
+
+import metrics
+from extraction import BUSINESS_COLUMNS
+from records import BusinessCleaner
+
+CREDENTIALS_FILE = r'C:\Users\ayo\Webscraping\elegant-moment-413814-6e8f42efa6fc.json'
+SPREADSHEET = "ShopMammy Tracker"
+SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+# API statuses worth retrying: quota exhaustion and transient server errors
+RETRY_CODES = (429, 500, 502, 503)
+
+logger = logging.getLogger(__name__)
+
+
+def authorize(credentials_path=CREDENTIALS_FILE):
+    """Authorized gspread client for the service account"""
+    creds = ServiceAccountCredentials.from_json_keyfile_name(credentials_path, SCOPE)
+    return gspread.authorize(creds)
+
+
+class Sink:
+    """Destination for scraped records.
+
+    Records are dicts keyed by `columns` or tuples in `columns` order, such as
+    extraction.BusinessRecord. They are buffered and written in batches once
+    `batch_size` rows are pending or the oldest pending row is `max_delay` seconds
+    old; flush() writes whatever is pending. Batches of business rows are cleaned and
+    deduplicated by a records.BusinessCleaner first, unless `clean` is False.
+    Subclasses implement _write_rows.
+    """
+
+    def __init__(self, columns=BUSINESS_COLUMNS, batch_size=100, max_delay=None, clean=True):
+        self.columns = tuple(columns)
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.cleaner = BusinessCleaner(self.columns) if clean and self.columns == BUSINESS_COLUMNS else None
+        self.rows = []
+        self.written = 0
+        self._first_pending = None
+
+    def write(self, record):
+        if not self.rows:
+            self._first_pending = time.monotonic()
+        if isinstance(record, tuple):
+            self.rows.append(record)
+        else:
+            self.rows.append([record.get(column) for column in self.columns])
+        if len(self.rows) >= self.batch_size or (
+                self.max_delay is not None and time.monotonic() - self._first_pending >= self.max_delay):
+            self.flush()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        if self.rows:
+            # Pending rows are only dropped once the write succeeded
+            with metrics.timer('sink_flush_seconds', sink=type(self).__name__):
+                rows, keys = self.cleaner.clean(self.rows) if self.cleaner else (self.rows, None)
+                if rows:
+                    self._write_rows(rows)
+            if self.cleaner:
+                self.cleaner.remember(keys)
+            metrics.counter('sink_rows_total', sink=type(self).__name__).inc(len(rows))
+            self.written += len(rows)
+            self.rows = []
+
+    def _write_rows(self, rows):
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CSVSink(Sink):
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'a', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        if new_file:
+            self.writer.writerow(self.columns)
+
+    def _write_rows(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+
+class JSONLSink(Sink):
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def _write_rows(self, rows):
+        self.file.write(''.join(json.dumps(dict(zip(self.columns, row)), ensure_ascii=False) + '\n'
+                                for row in rows))
+        self.file.flush()
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+
+class SQLiteSink(Sink):
+    def __init__(self, path, table='businesses', **kwargs):
+        super().__init__(**kwargs)
+        # Writes may come from a worker thread (see BusinessListScraper.crawl), one at a time
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        column_defs = ', '.join(f'"{column}" TEXT' for column in self.columns)
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({column_defs})')
+        placeholders = ', '.join('?' for _ in self.columns)
+        self.insert_sql = f'INSERT INTO "{table}" VALUES ({placeholders})'
+
+    def _write_rows(self, rows):
+        with self.conn:
+            self.conn.executemany(self.insert_sql, rows)
+
+    def close(self):
+        super().close()
+        self.conn.close()
+
+
+class ParquetSink(Sink):
+    """Writes each batch as a Parquet row group; needs pyarrow"""
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("ParquetSink needs pyarrow: pip install pyarrow")
+        self.pa = pa
+        self.schema = pa.schema([(column, pa.string()) for column in self.columns])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def _write_rows(self, rows):
+        columns = list(zip(*rows))
+        self.writer.write_table(self.pa.Table.from_arrays(
+            [self.pa.array(column, type=self.pa.string()) for column in columns], schema=self.schema))
+
+    def close(self):
+        super().close()
+        self.writer.close()
+
+
+class GoogleSheetSink(Sink):
+    """Long-lived Google Sheets sink.
+
+    The client and worksheet are opened once and reused, and whether the header row
+    exists is checked once with a single-row read instead of reading the whole sheet.
+    A header row is written to an empty sheet, and an older header missing some of
+    `columns` at the end is extended. Rows are sent with one append_rows call per
+    batch; quota (429) and transient
+    server errors are retried with jittered exponential backoff. Pass `client` to
+    reuse an authorized client or a FakeSheetsClient.
+    """
+
+    def __init__(self, spreadsheet=SPREADSHEET, worksheet_index=0, client=None,
+                 credentials_path=CREDENTIALS_FILE, retries=5, backoff=2.0, batch_size=200,
+                 max_delay=60.0, **kwargs):
+        super().__init__(batch_size=batch_size, max_delay=max_delay, **kwargs)
+        self.spreadsheet = spreadsheet
+        self.worksheet_index = worksheet_index
+        self.client = client
+        self.credentials_path = credentials_path
+        self.retries = retries
+        self.backoff = backoff
+        self._worksheet = None
+        self._has_header = None
+
+    @property
+    def worksheet(self):
+        if self._worksheet is None:
+            if self.client is None:
+                self.client = authorize(self.credentials_path)
+            self._worksheet = self.client.open(self.spreadsheet).get_worksheet(self.worksheet_index)
+        return self._worksheet
+
+    def read_records(self):
+        """Rows of the worksheet as dicts keyed by its header row, with the same retries as writes"""
+        return self._call(self.worksheet.get_all_records)
+
+    def _check_header(self):
+        """Whether the sheet has a header; one that lacks trailing columns of this sink is extended"""
+        header = self._call(self.worksheet.row_values, 1)
+        if not header:
+            return False
+        columns = list(self.columns)
+        if header == columns[:len(header)] and len(header) < len(columns):
+            self._call(self.worksheet.batch_update, [{'range': 'A1', 'values': [columns]}])
+            logger.info("Extended the header of %s with %s", self.spreadsheet, columns[len(header):])
+        elif header != columns:
+            logger.warning("Header of %s doesn't match the columns written: %s", self.spreadsheet, header)
+        return True
+
+    def _write_rows(self, rows):
+        if self._has_header is None:
+            self._has_header = self._check_header()
+        if not self._has_header:
+            rows = [list(self.columns)] + rows
+        self._call(self.worksheet.append_rows, rows)
+        self._has_header = True
+        logger.info("Appended %d rows to %s", len(rows), self.spreadsheet)
+
+    def _call(self, method, *args):
+        for attempt in range(self.retries):
+            try:
+                return method(*args)
+            except Exception as e:
+                code = getattr(e, 'code', None)
+                if code not in RETRY_CODES or attempt == self.retries - 1:
+                    raise
+                delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                logger.warning("Sheets API error %s, retrying in %.1fs", code, delay)
+                time.sleep(delay)
+
+
+SINKS = {
+    'csv': CSVSink,
+    'jsonl': JSONLSink,
+    'sqlite': SQLiteSink,
+    'parquet': ParquetSink,
+}
+
+
+def open_sink(kind, path=None, **kwargs):
+    """Build a sink by name: 'sheets' or one of the local file sinks in SINKS"""
+    if kind == 'sheets':
+        return GoogleSheetSink(**kwargs)
+    return SINKS[kind](path, **kwargs)
@@ -0,0 +1,58 @@
+import sqlite3
+
+from crawl_state import CrawlState
+
+PAGES = [f"https://www.businesslist.com.ng/category/small-business/{page}" for page in range(1, 6)]
+
+
+def test_interrupted_pass_resumes(tmp_path):
+    state = CrawlState(str(tmp_path / 'state.sqlite'))
+    assert state.start(PAGES) == PAGES
+    state.commit(PAGES[:2], {})
+    # The run stopped here; the next one only visits what is left
+    assert state.start(PAGES) == PAGES[2:]
+    assert set(state.passes(PAGES).values()) == {1}
+
+
+def test_finished_pass_starts_a_new_one(tmp_path):
+    state = CrawlState(str(tmp_path / 'state.sqlite'))
+    state.start(PAGES)
+    state.commit(PAGES, {'https://www.businesslist.com.ng/company/1/a': 'hash'})
+    assert state.start(PAGES) == PAGES
+    assert set(state.passes(PAGES).values()) == {2}
+    assert state.is_unchanged('https://www.businesslist.com.ng/company/1/a', 'hash')
+
+
+def test_failed_page_does_not_block_the_next_pass(tmp_path):
+    state = CrawlState(str(tmp_path / 'state.sqlite'))
+    for run in range(3):
+        # Every page is visited every run, the always-failing last page included
+        assert state.start(PAGES) == PAGES
+        state.commit(PAGES[:-1], {}, failed_urls=PAGES[-1:])
+    assert set(state.passes(PAGES).values()) == {3}
+
+
+def test_page_sets_keep_their_own_passes(tmp_path):
+    state = CrawlState(str(tmp_path / 'state.sqlite'))
+    shards = [PAGES[:2], PAGES[2:4], PAGES[4:]]
+    for shard in shards:
+        state.start(shard)
+    # A run of the first shard was interrupted with one page left
+    state.commit(shards[0][:1], {})
+    state.commit(shards[1] + shards[2], {})
+    assert state.start(shards[0]) == shards[0][1:]
+    assert state.start(shards[1]) == shards[1]
+    assert state.start(shards[2]) == shards[2]
+
+
+def test_state_files_without_passes_are_upgraded(tmp_path):
+    path = str(tmp_path / 'state.sqlite')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE frontier (page_url TEXT PRIMARY KEY, position INTEGER NOT NULL, "
+                 "done INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL)")
+    conn.execute("INSERT INTO frontier VALUES (?, 0, 1, 0)", (PAGES[0],))
+    conn.commit()
+    conn.close()
+    state = CrawlState(path)
+    assert state.start(PAGES[:1]) == PAGES[:1]
+    assert state.passes(PAGES[:1]) == {PAGES[0]: 2}
@@ -0,0 +1,56 @@
+import os
+
+import extraction
+from crawl_state import CrawlState
+from Scraper_script import BusinessListScraper
+
+RECORDED = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench', 'recorded')
+
+
+def read_page(name):
+    with open(os.path.join(RECORDED, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def make_scraper(tmp_path, monkeypatch):
+    # The scraper logs to scraper.log in the working directory
+    monkeypatch.chdir(tmp_path)
+    return BusinessListScraper(cache_path=None)
+
+
+def test_compiled_extractor_matches_reference(tmp_path, monkeypatch):
+    scraper = make_scraper(tmp_path, monkeypatch)
+    assert scraper.check_parity([RECORDED]) == []
+
+
+def test_recorded_pages_are_extracted(tmp_path, monkeypatch):
+    scraper = make_scraper(tmp_path, monkeypatch)
+    links = scraper.extract_links_from_html(read_page('listing1.html'))
+    assert links == [
+        'https://www.businesslist.com.ng/company/12345/kemi-fashion-house',
+        'https://www.businesslist.com.ng/company/12347/greenfield-agro-ventures',
+        'https://www.businesslist.com.ng/company/12349/bright-star-pharmacy',
+    ]
+    record = extraction.extract_business_record(read_page('detail2.html'))
+    assert record.company_name == 'Okafor & Sons Hardware'
+    # Mobile phone stands in for a missing contact number
+    assert record.phone_number == '0706-555-0101'
+    assert record.company_size == '51-100'
+
+
+def test_last_page_ignores_other_categories():
+    page = read_page('listing1.html')
+    # The page also links to /category/restaurants/40
+    assert extraction.extract_last_page(page, 'small-business') == 87
+    assert extraction.extract_last_page(read_page('listing2.html'), 'small-business') == 87
+
+
+def test_record_and_dict_hash_the_same(tmp_path, monkeypatch):
+    scraper = make_scraper(tmp_path, monkeypatch)
+    scraper.state = CrawlState(str(tmp_path / 'state.sqlite'))
+    page = read_page('detail1.html')
+    url = 'https://www.businesslist.com.ng/company/12345/kemi-fashion-house'
+    assert scraper.is_new_or_changed(url, extraction.extract_business_record(page))
+    scraper.commit_progress()
+    # The sync crawl's dict of the same business is recognized as unchanged
+    assert not scraper.is_new_or_changed(url, extraction.extract_business_details(page))
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+from records import STRING_DTYPE, bucket_sizes, normalize_phones
+
+
+@pytest.mark.parametrize('phones, expected', [
+    ('+234 803 123 4567', '08031234567'),
+    ('234-803-123-4567', '08031234567'),
+    ('0803-123-4567', '08031234567'),
+    ('803 123 4567', '08031234567'),
+    ('0802345678', '0802345678'),
+    ('0803 123 4567; +234 805 555 0000', '08031234567, 08055550000'),
+    ('ext. 12', 'ext. 12'),
+    (None, None),
+])
+def test_normalize_phones(phones, expected):
+    normalized = normalize_phones(pd.Series([phones], dtype=STRING_DTYPE))
+    assert (None if pd.isna(normalized[0]) else normalized[0]) == expected
+
+
+@pytest.mark.parametrize('employees, expected', [
+    ('1-5', 'Small'),
+    ('50', 'Small'),
+    ('51', 'Medium'),
+    ('1-50', 'Small'),
+    ('50-51', 'Unknown'),
+    ('99', 'Medium'),
+    ('100', 'Medium'),
+    ('51-500', 'Medium'),
+    ('500', 'Medium'),
+    ('501', 'Large'),
+    ('500+', 'Large'),
+    ('501+', 'Large'),
+    ('1000+', 'Large'),
+    ('100+', 'Unknown'),
+    ('a few', 'Unknown'),
+    (None, None),
+])
+def test_bucket_sizes(employees, expected):
+    sizes = bucket_sizes(pd.Series([employees], dtype=STRING_DTYPE))
+    assert (None if pd.isna(sizes[0]) else sizes[0]) == expected
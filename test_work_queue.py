@@ -0,0 +1,65 @@
+from bench.server import BenchServer
+from fake_sheets import FakeSheetsClient
+from Scraper_script import BusinessListScraper
+from sinks import GoogleSheetSink
+from work_queue import WorkQueue
+
+CRAWL_OPTIONS = dict(concurrency=4, per_host=4, rate=10_000, adaptive=False)
+
+
+class BrokenPageServer(BenchServer):
+    """Bench server whose listing page `broken` always answers 404"""
+
+    def __init__(self, broken, **kwargs):
+        super().__init__(**kwargs)
+        self.broken = broken
+
+    def page(self, path):
+        if path == self.broken:
+            return None
+        return super().page(path)
+
+
+def crawl_shards(scraper, tmp_path, run):
+    queue = WorkQueue(str(tmp_path / f'queue-{run}.sqlite'))
+    queue.add_pages('small-business', 6, shard_pages=2)
+    sink = GoogleSheetSink(client=FakeSheetsClient())
+    try:
+        scraper.work(queue, 'worker', sink, poll=0, **CRAWL_OPTIONS)
+        sink.close()
+        return queue.stats(), sink.written
+    finally:
+        queue.close()
+
+
+def test_failed_shard_does_not_hold_up_the_others(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with BrokenPageServer('/category/small-business/2', last_page=6) as server:
+        scraper = BusinessListScraper(cache_path=None, state_path=str(tmp_path / 'state.sqlite'),
+                                      site_url=server.url)
+        # Shard 1-2 fails on page 2 every attempt; shards 3-4 and 5-6 are still crawled
+        stats, written = crawl_shards(scraper, tmp_path, 1)
+        assert stats == {'done': 2, 'failed': 1}
+        assert written > 0
+        pages = [f"{server.url}/category/small-business/{page}" for page in range(1, 7)]
+        assert scraper.state.passes(pages[2:]) == dict.fromkeys(pages[2:], 1)
+
+        # The next scheduled run crawls every shard again in a new pass
+        stats, _ = crawl_shards(scraper, tmp_path, 2)
+        assert stats == {'done': 2, 'failed': 1}
+        assert scraper.state.passes(pages[2:]) == dict.fromkeys(pages[2:], 2)
+
+
+def test_new_pass_requeues_finished_shards(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.sqlite'))
+    queue.add_categories(['small-business', 'shops'])
+    first = queue.claim('w1')
+    queue.complete(first, 'w1')
+    queue.add_pages(first.category, 4, shard_pages=2)
+    queue.fail(queue.claim('w1'), 'w1', 'boom')
+    assert queue.add_categories(['small-business']) == 0
+
+    queue.new_pass()
+    assert queue.stats() == {'pending': 2}
+    assert queue.claim('w1').attempts == 1
+    queue.close()
@@ -0,0 +1,187 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+# Statuses that mean the host wants us to slow down
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value):
+    """Return the delay in seconds asked for by a Retry-After header, or None"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return max(0.0, float(value))
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class _HostState:
+    def __init__(self, rate, limit):
+        self.rate = rate                # requests per second
+        self.limit = limit              # max in-flight requests
+        self.in_flight = 0
+        self.next_send = 0.0            # monotonic time of the next free pacing slot
+        self.blocked_until = 0.0        # set by Retry-After and error backoff
+        self.latency = None             # EWMA of response latency
+        self.best_latency = None
+        self.errors = 0                 # consecutive throttle signals
+        self.successes = 0              # clean responses since the last limit change
+        self.last_decrease = 0.0
+        self.lock = threading.Lock()
+        self.cond = None                # asyncio.Condition, created inside the running loop
+
+
+class AdaptiveThrottle:
+    """Per-host rate and concurrency controller driven by response feedback.
+
+    Each host starts at `rate` requests/second and `concurrency` in-flight requests.
+    Clean responses faster than `target_latency` raise the rate additively and widen
+    the concurrency limit; 429/503 responses, timeouts, connection errors and rising
+    latency cut both multiplicatively. Retry-After blocks the host for the requested
+    time. Call `observe` after every request so the controller can adjust.
+    With `adaptive=False` the rate and concurrency stay fixed, but Retry-After and
+    error backoff are still honored.
+    """
+
+    def __init__(self, rate=1.0, concurrency=2, min_rate=0.1, max_rate=10.0,
+                 max_concurrency=16, global_concurrency=None, target_latency=1.0,
+                 rate_step=0.25, decrease_factor=0.5, backoff=1.0, max_backoff=60.0,
+                 adaptive=True):
+        self.rate = rate
+        self.concurrency = concurrency
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.rate_step = rate_step
+        self.decrease_factor = decrease_factor
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.adaptive = adaptive
+        self._global = asyncio.Semaphore(global_concurrency) if global_concurrency else None
+        self._hosts = {}
+
+    def _state(self, url):
+        host = urlsplit(url).netloc
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts.setdefault(host, _HostState(self.rate, self.concurrency))
+        return state
+
+    def _reserve(self, state):
+        """Claim the next pacing slot for a host and return how long to wait for it"""
+        with state.lock:
+            now = time.monotonic()
+            start = max(now, state.next_send, state.blocked_until)
+            state.next_send = start + 1.0 / state.rate
+            return start - now
+
+    def wait_sync(self, url):
+        """Block until the host of `url` may receive another request (for serial callers)"""
+        state = self._state(url)
+        while True:
+            delay = self._reserve(state)
+            if delay > 0:
+                time.sleep(delay)
+            if time.monotonic() >= state.blocked_until:
+                return
+
+    @asynccontextmanager
+    async def slot(self, url):
+        """Hold one request slot for the host of `url` for the duration of the block"""
+        state = self._state(url)
+        if state.cond is None:
+            state.cond = asyncio.Condition()
+        async with state.cond:
+            await state.cond.wait_for(lambda: state.in_flight < state.limit)
+            state.in_flight += 1
+        try:
+            if self._global is not None:
+                await self._global.acquire()
+            try:
+                while True:
+                    delay = self._reserve(state)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    if time.monotonic() >= state.blocked_until:
+                        break
+                yield
+            finally:
+                if self._global is not None:
+                    self._global.release()
+        finally:
+            async with state.cond:
+                state.in_flight -= 1
+                state.cond.notify_all()
+
+    def observe(self, url, latency=None, status=None, retry_after=None, error=False):
+        """Feed back the outcome of one request.
+
+        `error` marks timeouts and connection failures; `retry_after` is the raw
+        Retry-After header value (or seconds) if the response carried one.
+        """
+        state = self._state(url)
+        with state.lock:
+            now = time.monotonic()
+            if latency is not None:
+                state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+                state.best_latency = latency if state.best_latency is None else min(state.best_latency, latency)
+
+            if error or status in THROTTLE_STATUSES:
+                state.errors += 1
+                delay = parse_retry_after(retry_after)
+                if delay is None:
+                    delay = min(self.max_backoff, self.backoff * 2 ** (state.errors - 1))
+                state.blocked_until = max(state.blocked_until, now + delay)
+                self._decrease(state, now)
+                return
+
+            state.errors = 0
+            if status is not None and status >= 400:
+                # Not a throttling signal, but not evidence the host can take more either
+                return
+            if state.latency is not None and state.latency > max(self.target_latency, 2 * state.best_latency):
+                self._decrease(state, now)
+            else:
+                self._increase(state)
+
+    def _decrease(self, state, now):
+        # At most one cut per round trip, so a burst of failures counts once
+        if not self.adaptive or now - state.last_decrease < (state.latency or 1.0):
+            return
+        state.rate = max(self.min_rate, state.rate * self.decrease_factor)
+        state.limit = max(1, int(state.limit * self.decrease_factor))
+        state.successes = 0
+        state.last_decrease = now
+
+    def _increase(self, state):
+        if not self.adaptive:
+            return
+        state.rate = min(self.max_rate, state.rate + self.rate_step)
+        state.successes += 1
+        if state.successes >= state.limit:
+            state.limit = min(self.max_concurrency, state.limit + 1)
+            state.successes = 0
+
+    def snapshot(self):
+        """Current rate, concurrency limit and latency for every host seen so far"""
+        return {
+            host: {'rate': round(state.rate, 3), 'limit': state.limit,
+                   'latency': round(state.latency, 3) if state.latency is not None else None}
+            for host, state in self._hosts.items()
+        }
@@ -0,0 +1,211 @@
+import sqlite3
+import threading
+import time
+
+
+class Shard:
+    __slots__ = ('id', 'kind', 'category', 'first_page', 'last_page', 'attempts', 'lease_until')
+
+    def __init__(self, id, kind, category, first_page, last_page, attempts, lease_until):
+        self.id = id
+        self.kind = kind                # 'category' to discover its pages, 'pages' to crawl them
+        self.category = category
+        self.first_page = first_page
+        self.last_page = last_page
+        self.attempts = attempts
+        self.lease_until = lease_until
+
+    @property
+    def pages(self):
+        return range(self.first_page, self.last_page + 1)
+
+    def __repr__(self):
+        if self.kind == 'category':
+            return f"Shard({self.id}, discover {self.category})"
+        return f"Shard({self.id}, {self.category} pages {self.first_page}-{self.last_page})"
+
+
+class WorkQueue:
+    """Lease-based queue of crawl shards in a SQLite file shared by every worker.
+
+    A worker claims a shard for `lease` seconds and must renew the lease while it
+    works and complete the shard when done. A shard whose lease runs out, because its
+    worker died or lost the file, becomes claimable again, so a lost worker only
+    costs a retry of its current shard. Shards are retried up to `max_attempts`
+    times before being marked failed. Claims use an immediate transaction, so
+    workers in separate processes never receive the same shard. Workers on other
+    machines can share the file over a network filesystem whose locking works.
+    """
+
+    def __init__(self, path='work_queue.sqlite', lease=300.0, max_attempts=3):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        # The rollback journal rather than WAL, whose shared memory index only works on one host
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS shards (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                category TEXT NOT NULL,
+                first_page INTEGER,
+                last_page INTEGER,
+                state TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                UNIQUE (kind, category, first_page)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS shards_state ON shards (state, lease_until)")
+
+    def add_categories(self, categories):
+        """Queue a discovery shard per category; returns how many were new"""
+        return self._add([('category', category, None, None) for category in categories])
+
+    def add_pages(self, category, last_page, shard_pages=10, first_page=1):
+        """Queue pages `first_page`..`last_page` of a category in shards of `shard_pages` pages"""
+        return self._add([('pages', category, start, min(start + shard_pages - 1, last_page))
+                          for start in range(first_page, last_page + 1, shard_pages)])
+
+    def _add(self, shards):
+        now = time.time()
+        # NULL first_page never collides in a UNIQUE index, so discovery shards use 0
+        with self._transaction():
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO shards (kind, category, first_page, last_page, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(kind, category, first_page or 0, last_page, now) for kind, category, first_page, last_page in shards],
+            )
+            return self.conn.total_changes - before
+
+    def new_pass(self):
+        """Start the crawl over: page shards are dropped and every category is discovered again"""
+        with self._transaction():
+            self.conn.execute("DELETE FROM shards WHERE kind = 'pages'")
+            self.conn.execute(
+                "UPDATE shards SET state = 'pending', worker = NULL, lease_until = NULL, attempts = 0, "
+                "error = NULL, updated_at = ?",
+                (time.time(),),
+            )
+
+    def claim(self, worker):
+        """Lease the next pending or expired shard to `worker`, or return None if there is none"""
+        now = time.time()
+        with self._transaction():
+            # Leases that ran out on their last attempt will never be claimed again
+            self.conn.execute(
+                "UPDATE shards SET state = 'failed', error = 'lease expired', updated_at = ? "
+                "WHERE state = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            row = self.conn.execute(
+                "SELECT id, kind, category, first_page, last_page, attempts FROM shards "
+                "WHERE (state = 'pending' OR (state = 'leased' AND lease_until < ?)) AND attempts < ? "
+                "ORDER BY kind = 'pages', id LIMIT 1",
+                (now, self.max_attempts),
+            ).fetchone()
+            if row is None:
+                return None
+            shard_id, kind, category, first_page, last_page, attempts = row
+            lease_until = now + self.lease
+            self.conn.execute(
+                "UPDATE shards SET state = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                (worker, lease_until, now, shard_id),
+            )
+        return Shard(shard_id, kind, category, first_page, last_page, attempts + 1, lease_until)
+
+    def renew(self, shard, worker):
+        """Extend the lease; False if the shard has been taken over by another worker"""
+        now = time.time()
+        with self._transaction():
+            renewed = self.conn.execute(
+                "UPDATE shards SET lease_until = ?, updated_at = ? WHERE id = ? AND worker = ? AND state = 'leased'",
+                (now + self.lease, now, shard.id, worker),
+            ).rowcount
+        return bool(renewed)
+
+    def complete(self, shard, worker):
+        with self._transaction():
+            self.conn.execute(
+                "UPDATE shards SET state = 'done', lease_until = NULL, error = NULL, updated_at = ? "
+                "WHERE id = ? AND worker = ?",
+                (time.time(), shard.id, worker),
+            )
+
+    def fail(self, shard, worker, error):
+        """Give a shard back; it is retried until it has used up max_attempts"""
+        state = 'failed' if shard.attempts >= self.max_attempts else 'pending'
+        with self._transaction():
+            self.conn.execute(
+                "UPDATE shards SET state = ?, lease_until = NULL, error = ?, updated_at = ? "
+                "WHERE id = ? AND worker = ?",
+                (state, str(error), time.time(), shard.id, worker),
+            )
+
+    def stats(self):
+        """Shard counts by state, with expired leases counted as 'expired'"""
+        rows = self.conn.execute(
+            "SELECT CASE WHEN state = 'leased' AND lease_until < ? THEN 'expired' ELSE state END, COUNT(*) "
+            "FROM shards GROUP BY 1",
+            (time.time(),),
+        )
+        return dict(rows)
+
+    def has_work(self):
+        """True while any shard is pending or leased, including leases that may still expire"""
+        return self.conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM shards WHERE state IN ('pending', 'leased'))"
+        ).fetchone()[0] == 1
+
+    def _transaction(self):
+        return _Transaction(self.conn)
+
+    def heartbeat(self, shard, worker, interval=None):
+        """Background thread renewing `shard`'s lease every `interval` seconds; call stop() when done"""
+        return _Heartbeat(self.path, self.lease, shard, worker, interval or self.lease / 3)
+
+    def close(self):
+        self.conn.close()
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, so a claim's read and update can't interleave with another worker's"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+class _Heartbeat:
+    def __init__(self, path, lease, shard, worker, interval):
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(path, lease, shard, worker, interval), daemon=True)
+        self._thread.start()
+
+    def _run(self, path, lease, shard, worker, interval):
+        # SQLite connections belong to one thread, so the heartbeat opens its own
+        queue = WorkQueue(path, lease=lease)
+        try:
+            while not self._stop.wait(interval):
+                if not queue.renew(shard, worker):
+                    self.lost = True
+                    return
+        finally:
+            queue.close()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()